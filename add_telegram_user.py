@@ -4,29 +4,17 @@ Quick Telegram user registration
 Usage: python add_telegram_user.py <username> <chat_id>
 """
 
-import json
 import sys
-import os
 
-TELEGRAM_USERS_FILE = 'telegram_users.json'
+from register_telegram_user import load_users, save_user
 
 def add_user(username, chat_id):
-    # Load existing users
-    users = {}
-    if os.path.exists(TELEGRAM_USERS_FILE):
-        with open(TELEGRAM_USERS_FILE, 'r') as f:
-            users = json.load(f)
-    
     # Add new user
     username = username.strip().lower().lstrip('@')
-    users[username] = str(chat_id)
-    
-    # Save
-    with open(TELEGRAM_USERS_FILE, 'w') as f:
-        json.dump(users, f, indent=2)
+    save_user(username, chat_id)
     
     print(f"✅ Registered: @{username} → {chat_id}")
-    print(f"Total users: {len(users)}")
+    print(f"Total users: {len(load_users())}")
 
 if __name__ == '__main__':
     if len(sys.argv) != 3:
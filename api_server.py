@@ -14,6 +14,7 @@ from flask import Flask, request, jsonify
 from flask_cors import CORS
 from web3 import Web3
 from hale_oracle_backend import HaleOracle
+from register_telegram_user import load_users, save_user
 import requests
 import hashlib
 import hmac
@@ -49,23 +50,20 @@ telegram_users = {}  # {username: chat_id} - populated when users /start the bot
 # Initialize Oracle
 oracle = HaleOracle(GEMINI_API_KEY, ARC_RPC_URL)
 
-# Load existing Telegram user mappings from file (if exists)
-TELEGRAM_USERS_FILE = 'telegram_users.json'
+# Load existing Telegram user mappings (shared SQLite store, see register_telegram_user.py)
 try:
-    if os.path.exists(TELEGRAM_USERS_FILE):
-        with open(TELEGRAM_USERS_FILE, 'r') as f:
-            telegram_users = json.load(f)
-            print(f"[Telegram] Loaded {len(telegram_users)} user mappings")
+    telegram_users = load_users()
+    print(f"[Telegram] Loaded {len(telegram_users)} user mappings")
 except Exception as e:
     print(f"[Telegram] Could not load user mappings: {e}")
 
-def save_telegram_users():
-    """Save telegram user mappings to file"""
+def save_telegram_user(username, chat_id):
+    """Record a single telegram user mapping (in memory and on disk)"""
+    telegram_users[username] = str(chat_id)
     try:
-        with open(TELEGRAM_USERS_FILE, 'w') as f:
-            json.dump(telegram_users, f, indent=2)
+        save_user(username, chat_id)
     except Exception as e:
-        print(f"[Telegram] Error saving user mappings: {e}")
+        print(f"[Telegram] Error saving user mapping: {e}")
 
 def generate_otp():
     """Generate 5-digit OTP"""
@@ -191,8 +189,8 @@ def listen_for_events():
             
             for log in escrow_logs:
                 # Decode escrow address from topics[1]
-                escrow_address = Web3.to_checksum_address('0x' + log['topics'][1].hex()[-40:])
-                owner = Web3.to_checksum_address('0x' + log['topics'][2].hex()[-40:])
+                escrow_address = Web3.to_checksum_address(log['topics'][1][-20:])
+                owner = Web3.to_checksum_address(log['topics'][2][-20:])
                 
                 active_escrows.add(escrow_address)
                 print(f"[Daemon] 🆕 New escrow created: {escrow_address} (owner: {owner})")
@@ -210,7 +208,7 @@ def listen_for_events():
                 
                 for log in req_logs:
                     escrow_address = log['address']
-                    seller = Web3.to_checksum_address('0x' + log['topics'][1].hex()[-40:])
+                    seller = Web3.to_checksum_address(log['topics'][1][-20:])
                     
                     # Decode the event data to get requirements and contact
                     contract = oracle.web3.eth.contract(address=escrow_address, abi=escrow_abi)
@@ -260,7 +258,7 @@ def listen_for_events():
                 delivery_logs = oracle.web3.eth.get_logs(delivery_filter)
                 
                 for log in delivery_logs:
-                    seller = Web3.to_checksum_address('0x' + log['topics'][1].hex()[-40:])
+                    seller = Web3.to_checksum_address(log['topics'][1][-20:])
                     print(f"[Daemon] 📦 Delivery submitted by {seller} (on-chain)")
             
             latest_block = current_block + 1
@@ -396,8 +394,7 @@ def telegram_webhook():
         # Handle /start command
         if text.startswith('/start'):
             if username:
-                telegram_users[username] = str(chat_id)
-                save_telegram_users()
+                save_telegram_user(username, chat_id)
                 print(f"[Telegram] ✅ Registered user: @{username} -> {chat_id}")
                 
                 # Send welcome message
@@ -796,8 +793,7 @@ def telegram_verify_login():
             
             # Update our user mapping if applicable
             if user['username']:
-                telegram_users[user['username'].lower()] = str(user['id'])
-                save_telegram_users()
+                save_telegram_user(user['username'].lower(), user['id'])
                 
             return jsonify({'ok': True, 'user': user})
         else:
@@ -8,11 +8,12 @@ HALE (H-A-L-E = 8 in numerology) represents balance and strength.
 
 import json
 import os
+import re
 import sys
 import subprocess
 import tempfile
 import time
-from typing import Dict, Any, Optional
+from typing import Dict, Any, List, Optional
 try:
     # Try new google.genai package first
     import google.genai as genai
@@ -63,20 +64,26 @@ if os.environ.get('MOCK_GEMINI') is None:
     pass
 
 
+# Python code indicators, matched in a single pass over the raw bytes
+_EXEC_CODE_RE = re.compile(rb'def |import |print\(|class |if __name__ ==')
+
 class HaleOracle:
     """HALE Oracle that verifies deliveries using Gemini AI."""
     
-    def __init__(self, gemini_api_key: str, arc_rpc_url: Optional[str] = None):
+    def __init__(self, gemini_api_key: str, arc_rpc_url: Optional[str] = None,
+                 simulation_mode: bool = False):
         """
         Initialize the HALE Oracle.
         
         Args:
             gemini_api_key: Google Gemini API key
             arc_rpc_url: Optional Circle Arc blockchain RPC URL
+            simulation_mode: Start in mock mode, skipping Gemini setup and its
+                             connectivity check (e.g. for sandbox-only use)
         """
         self.gemini_api_key = gemini_api_key
         self.arc_rpc_url = arc_rpc_url
-        self.mock_mode = False
+        self.mock_mode = simulation_mode
         
         # Check MOCK_MOD env override
         if os.environ.get('MOCK_GEMINI') == 'true' or os.environ.get('MOCK_GEMINI') == '1':
@@ -233,18 +240,7 @@ class HaleOracle:
             # Send to Gemini
             print("[HALE Oracle] Sending delivery to HALE Oracle (Gemini)...")
             
-            if USE_NEW_API:
-                # New google.genai API
-                response = self.client.models.generate_content(
-                    model=self.model_name,
-                    contents=user_prompt,
-                    config={'system_instruction': self.system_prompt}
-                )
-                response_text = response.text.strip()
-            else:
-                # Legacy google.generativeai API
-                response = self.model.generate_content(user_prompt)
-                response_text = response.text.strip()
+            response_text = self._generate_text(user_prompt)
             
             # Remove markdown code blocks if present
             if response_text.startswith('```'):
@@ -264,31 +260,7 @@ class HaleOracle:
             if verdict.get('risk_flags'):
                 print(f"[HALE Oracle] Risk Flags: {', '.join(verdict.get('risk_flags', []))}")
             
-            # --- SUGGESTION 2: AUTOMATED EXECUTION SHUTTLING ---
-            # If the verdict is PASS but it's code, we run a quick sanity check
-            content = contract_data.get('Delivery_Content', '')
-            if verdict.get('verdict') == 'PASS' and self._is_executable_code(content):
-                print("[HALE Oracle] Pass detected for code delivery. Running sandboxed sanity check...")
-                sandbox_result = self.run_sandbox_test(content)
-                if not sandbox_result['success']:
-                    print(f"[HALE Oracle] SANDBOX FAILURE: {sandbox_result['error']}")
-                    verdict['verdict'] = 'FAIL'
-                    verdict['release_funds'] = False
-                    verdict['confidence_score'] = min(verdict['confidence_score'], 40)
-                    verdict['reasoning'] += f"\n\nSANDBOX FAILURE: The code failed to execute or contained errors: {sandbox_result['error']}"
-                    verdict['risk_flags'].append("RUNTIME_ERROR")
-            
-            # --- SUGGESTION 3: HUMAN-IN-THE-LOOP (HITL) ---
-            # If confidence is borderline (70-89), we mark for review instead of auto-releasing
-            confidence = verdict.get('confidence_score', 0)
-            if 70 <= confidence < 90 and verdict.get('verdict') == 'PASS':
-                print(f"[HALE Oracle] Borderline confidence ({confidence}%). Queuing for Human Review.")
-                verdict['verdict'] = 'PENDING_REVIEW'
-                verdict['release_funds'] = False
-                verdict['reasoning'] += "\n\nSTATUS: Queued for manual forensic audit due to borderline confidence score."
-                self.queue_for_review(contract_data, verdict)
-            
-            return verdict
+            return self._apply_safeguards(contract_data, verdict)
             
         except Exception as e:
             error_str = str(e)
@@ -329,11 +301,124 @@ class HaleOracle:
                 "risk_flags": ["SYSTEM_ERROR"]
             }
     
-    def _is_executable_code(self, content: str) -> bool:
-        """Helper to determine if content looks like Python code."""
-        # Simple heuristic
-        indicators = ['def ', 'import ', 'print(', 'class ', 'if __name__ ==']
-        return any(ind in content for ind in indicators)
+    def _generate_text(self, user_prompt: str, json_response: bool = False) -> str:
+        """Send a prompt to Gemini and return the stripped response text.
+        
+        Args:
+            user_prompt: Prompt text
+            json_response: Ask Gemini for application/json output
+        """
+        if USE_NEW_API:
+            # New google.genai API
+            config = {'system_instruction': self.system_prompt}
+            if json_response:
+                config['response_mime_type'] = 'application/json'
+            response = self.client.models.generate_content(
+                model=self.model_name,
+                contents=user_prompt,
+                config=config
+            )
+        elif json_response:
+            # Legacy google.generativeai API
+            response = self.model.generate_content(
+                user_prompt, generation_config={'response_mime_type': 'application/json'}
+            )
+        else:
+            # Legacy google.generativeai API
+            response = self.model.generate_content(user_prompt)
+        return response.text.strip()
+
+    def _apply_safeguards(self, contract_data: Dict[str, Any], verdict: Dict[str, Any]) -> Dict[str, Any]:
+        """Run the sandbox and HITL checks that may downgrade a PASS verdict."""
+        # --- SUGGESTION 2: AUTOMATED EXECUTION SHUTTLING ---
+        # If the verdict is PASS but it's code, we run a quick sanity check
+        content = contract_data.get('Delivery_Content', '')
+        if verdict.get('verdict') == 'PASS' and self._is_executable_code(content):
+            print("[HALE Oracle] Pass detected for code delivery. Running sandboxed sanity check...")
+            sandbox_result = self.run_sandbox_test(content)
+            if not sandbox_result['success']:
+                print(f"[HALE Oracle] SANDBOX FAILURE: {sandbox_result['error']}")
+                verdict['verdict'] = 'FAIL'
+                verdict['release_funds'] = False
+                verdict['confidence_score'] = min(verdict['confidence_score'], 40)
+                verdict['reasoning'] += f"\n\nSANDBOX FAILURE: The code failed to execute or contained errors: {sandbox_result['error']}"
+                verdict['risk_flags'].append("RUNTIME_ERROR")
+        
+        # --- SUGGESTION 3: HUMAN-IN-THE-LOOP (HITL) ---
+        # If confidence is borderline (70-89), we mark for review instead of auto-releasing
+        confidence = verdict.get('confidence_score', 0)
+        if 70 <= confidence < 90 and verdict.get('verdict') == 'PASS':
+            print(f"[HALE Oracle] Borderline confidence ({confidence}%). Queuing for Human Review.")
+            verdict['verdict'] = 'PENDING_REVIEW'
+            verdict['release_funds'] = False
+            verdict['reasoning'] += "\n\nSTATUS: Queued for manual forensic audit due to borderline confidence score."
+            self.queue_for_review(contract_data, verdict)
+        
+        return verdict
+
+    def verify_deliveries_batch(self, deliveries: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        Verify several deliveries with a single Gemini request.
+        
+        Args:
+            deliveries: List of contract_data dictionaries (see verify_delivery)
+            
+        Returns:
+            List of verdict dictionaries, in the same order as deliveries.
+            Verdicts are matched to deliveries by transaction_id; falls back to
+            one verify_delivery call per item if the batched response cannot be
+            parsed or its ids don't match the deliveries exactly.
+        """
+        if len(deliveries) <= 1 or self.mock_mode:
+            return [self.verify_delivery(d) for d in deliveries]
+        
+        print(f"[HALE Oracle] Batch-verifying {len(deliveries)} deliveries in one Gemini request...")
+        cases = '\n\n'.join(
+            f"---CASE {i}---\n{self.format_verification_request(d)}"
+            for i, d in enumerate(deliveries, 1)
+        )
+        user_prompt = (
+            f"Verify each of the {len(deliveries)} deliveries below independently. "
+            f"Return ONLY a JSON array of {len(deliveries)} verdict objects, one per case, "
+            f"in the same order, each following the output schema and echoing its case's "
+            f"transaction_id.\n\n{cases}"
+        )
+        
+        try:
+            response_text = self._generate_text(user_prompt, json_response=True)
+            json_start = response_text.find('[')
+            json_end = response_text.rfind(']') + 1
+            if json_start != -1 and json_end > json_start:
+                response_text = response_text[json_start:json_end]
+            verdicts = json.loads(response_text)
+            if (not isinstance(verdicts, list) or len(verdicts) != len(deliveries)
+                    or not all(isinstance(v, dict) for v in verdicts)):
+                raise ValueError(f"expected {len(deliveries)} verdict objects")
+            # Match verdicts to deliveries by transaction id, never by array position
+            by_id = {v.get('transaction_id'): v for v in verdicts}
+            if set(by_id) != {d.get('transaction_id') for d in deliveries} or len(by_id) != len(deliveries):
+                raise ValueError("verdict transaction ids don't match the deliveries")
+        except Exception as e:
+            print(f"[HALE Oracle] Batch verification failed ({e}). Falling back to single requests.")
+            return [self.verify_delivery(d) for d in deliveries]
+        
+        results = []
+        for contract_data in deliveries:
+            verdict = by_id[contract_data.get('transaction_id')]
+            verdict.setdefault('risk_flags', [])
+            verdict.setdefault('reasoning', '')
+            verdict.setdefault('confidence_score', 0)
+            print(f"[HALE Oracle] {contract_data.get('transaction_id', 'unknown')}: "
+                  f"{verdict.get('verdict', 'UNKNOWN')} ({verdict.get('confidence_score', 0)}%)")
+            results.append(self._apply_safeguards(contract_data, verdict))
+        return results
+    
+    def _is_executable_code(self, content) -> bool:
+        """Helper to determine if content (str or bytes) looks like Python code."""
+        # Simple heuristic, one regex pass instead of a scan per indicator
+        if isinstance(content, str):
+            content = content.encode('utf-8', 'ignore')
+        return _EXEC_CODE_RE.search(content) is not None
 
     def run_sandbox_test(self, code: str) -> Dict[str, Any]:
         """
@@ -418,11 +503,10 @@ except Exception as e:
         except Exception as e:
             return {'success': False, 'error': f"Sandbox System Error: {str(e)}"}
         finally:
-            if os.path.exists(temp_path):
-                try:
-                    os.unlink(temp_path)
-                except:
-                    pass
+            try:
+                os.unlink(temp_path)
+            except OSError:
+                pass
 
     def queue_for_review(self, contract_data: Dict[str, Any], verdict: Dict[str, Any]):
         """Saves a borderline verification to the pending_reviews directory."""
@@ -430,8 +514,7 @@ except Exception as e:
         # Ensure path is absolute and directory exists
         base_dir = os.path.dirname(os.path.abspath(__file__))
         reviews_dir = os.path.join(base_dir, 'pending_reviews')
-        if not os.path.exists(reviews_dir):
-            os.makedirs(reviews_dir)
+        os.makedirs(reviews_dir, exist_ok=True)
             
         review_path = os.path.join(reviews_dir, f"{review_id}.json")
         
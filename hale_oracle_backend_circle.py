@@ -5,14 +5,25 @@ Integrates with Google Gemini API and Circle Programmable Wallets
 to verify digital deliveries and trigger blockchain transactions.
 """
 
+import copy
+import functools
+import hashlib
 import json
 import os
 import sys
-from typing import Dict, Any, Optional
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Dict, Any, Iterable, Optional
 import google.generativeai as genai
 from web3 import Web3
 from circle_wallet_manager import CircleWalletManager, get_wallet_address_for_web3
 
+try:
+    import orjson
+except ImportError:  # optional speedup; stdlib json is the fallback
+    orjson = None
+
 # Load environment variables from .env file
 try:
     from dotenv import load_dotenv
@@ -21,6 +32,89 @@ except ImportError:
     pass  # dotenv not installed, rely on system environment
 
 
+def _json_loads(data):
+    """Parse JSON (str or bytes), using orjson when it is installed."""
+    if orjson:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+def _json_dumps(obj: Any, indent: bool = False) -> str:
+    """Serialize to a JSON string, using orjson when it is installed."""
+    if orjson:
+        return orjson.dumps(obj, option=orjson.OPT_INDENT_2 if indent else 0).decode()
+    return json.dumps(obj, indent=2 if indent else None)
+
+
+def _first_json_object(chunks: Iterable[str]) -> str:
+    """
+    Accumulate streamed text until the first top-level JSON object closes.
+    
+    Braces inside JSON strings are ignored. Returns everything received if no
+    complete object is seen, so the caller's parser reports the error.
+    """
+    buf = []
+    depth = 0
+    started = in_string = escaped = False
+    for chunk in chunks:
+        for i, ch in enumerate(chunk):
+            if in_string:
+                if escaped:
+                    escaped = False
+                elif ch == '\\':
+                    escaped = True
+                elif ch == '"':
+                    in_string = False
+            elif ch == '{':
+                depth += 1
+                started = True
+            elif not started:
+                continue
+            elif ch == '"':
+                in_string = True
+            elif ch == '}':
+                depth -= 1
+                if depth == 0:
+                    buf.append(chunk[:i + 1])
+                    return ''.join(buf)
+        buf.append(chunk)
+    return ''.join(buf)
+
+
+@functools.lru_cache(maxsize=4)
+def _load_system_prompt(path: str) -> str:
+    """Read a system prompt file once per process."""
+    return Path(path).read_text()
+
+
+@functools.lru_cache(maxsize=4)
+def _load_abi(path: str):
+    """Parse a contract ABI file once per process (treat the result as read-only)."""
+    return _json_loads(Path(path).read_bytes())
+
+
+# genai keeps one transport client (and its open connection) per configure()
+# call, so reconfigure only when the key changes and share model objects.
+_configured_api_key: Optional[str] = None
+_model_cache: Dict[tuple, Any] = {}
+
+
+def _get_gemini_model(api_key: str, model_name: str, system_prompt: str):
+    """Return a shared GenerativeModel, configuring genai at most once per key."""
+    global _configured_api_key
+    if api_key != _configured_api_key:
+        genai.configure(api_key=api_key)
+        _configured_api_key = api_key
+        _model_cache.clear()
+    key = (model_name, system_prompt)
+    if key not in _model_cache:
+        _model_cache[key] = genai.GenerativeModel(
+            model_name=model_name,
+            system_instruction=system_prompt
+        )
+    return _model_cache[key]
+
+
 class HaleOracleCircle:
     """HALE Oracle with Circle Programmable Wallet integration."""
     
@@ -64,58 +158,79 @@ class HaleOracleCircle:
             "ARC"
         )
         print(f"[Circle] Oracle wallet address: {self.wallet_address}")
-        
-        # Configure Gemini
-        genai.configure(api_key=gemini_api_key)
+        # Checksum once; reused as the 'from' field of every transaction
+        self._checksum_wallet = (Web3.to_checksum_address(self.wallet_address)
+                                 if self.wallet_address else None)
         
         # Load system prompt
         system_prompt_path = os.path.join(
             os.path.dirname(__file__), 
             'hale_oracle_system_prompt.txt'
         )
-        with open(system_prompt_path, 'r') as f:
-            self.system_prompt = f.read()
+        self.system_prompt = _load_system_prompt(system_prompt_path)
         
-        # Initialize Gemini model
-        self.model = genai.GenerativeModel(
-            model_name='gemini-1.5-pro',
-            system_instruction=self.system_prompt
-        )
+        # LRU of parsed verdicts so re-submitted deliveries skip Gemini
+        self._verdict_cache: "OrderedDict[bytes, Dict[str, Any]]" = OrderedDict()
+        self._verdict_cache_size = int(os.getenv('HALE_ORACLE_CACHE_SIZE', '256'))
+        
+        # Initialize Gemini model (shared across instances, reuses the connection)
+        self.model = _get_gemini_model(gemini_api_key, 'gemini-1.5-pro', self.system_prompt)
         
         # Initialize Web3 if RPC URL provided
         self.web3 = None
+        self._chain_id: Optional[int] = None
         if arc_rpc_url:
             self.web3 = Web3(Web3.HTTPProvider(arc_rpc_url))
             if not self.web3.is_connected():
                 print("Warning: Could not connect to Arc blockchain")
+            else:
+                # Chain id is fixed for the lifetime of the process
+                self._chain_id = self.web3.eth.chain_id
     
     def format_verification_request(self, contract_data: Dict[str, Any]) -> str:
         """Format the contract data into a prompt for Gemini."""
-        acceptance_criteria = contract_data.get('Acceptance_Criteria', [])
-        
-        prompt = f"""Input:
-{{
-  "transaction_id": "{contract_data.get('transaction_id', '')}",
-  "Contract_Terms": "{contract_data.get('Contract_Terms', '')}",
-  "Acceptance_Criteria": [
-{chr(10).join([f'    "{criterion}"' for criterion in acceptance_criteria])}
-  ],
-  "Delivery_Content": "{contract_data.get('Delivery_Content', '').replace(chr(10), '\\n').replace('"', '\\"')}"
-}}"""
-        return prompt
+        # One JSON serialization handles quoting and newline escaping of the delivery
+        return "Input:\n" + _json_dumps({
+            "transaction_id": contract_data.get('transaction_id', ''),
+            "Contract_Terms": contract_data.get('Contract_Terms', ''),
+            "Acceptance_Criteria": contract_data.get('Acceptance_Criteria', []),
+            "Delivery_Content": contract_data.get('Delivery_Content', '')
+        }, indent=True)
+    
+    def _verdict_cache_key(self, contract_data: Dict[str, Any]) -> bytes:
+        """Hash the system prompt and canonical contract data into a cache key."""
+        if orjson:
+            canonical = orjson.dumps(contract_data, option=orjson.OPT_SORT_KEYS)
+        else:
+            canonical = json.dumps(contract_data, sort_keys=True).encode()
+        return hashlib.blake2b(self.system_prompt.encode() + canonical).digest()
+    
+    def _generate_verdict_text(self, user_prompt: str) -> str:
+        """Stream the Gemini response, stopping once the verdict object is complete."""
+        try:
+            stream = self.model.generate_content(user_prompt, stream=True)
+        except TypeError:
+            # SDK without streaming support
+            return self.model.generate_content(user_prompt).text.strip()
+        return _first_json_object(chunk.text for chunk in stream).strip()
     
     def verify_delivery(self, contract_data: Dict[str, Any]) -> Dict[str, Any]:
         """Verify a delivery against contract terms using Gemini."""
         print(f"[HALE Oracle] Analyzing delivery for transaction: {contract_data.get('transaction_id', 'unknown')}")
         print(f"[HALE Oracle] Contract Terms: {contract_data.get('Contract_Terms', '')[:100]}...")
         
+        cache_key = self._verdict_cache_key(contract_data)
+        cached = self._verdict_cache.get(cache_key)
+        if cached is not None:
+            self._verdict_cache.move_to_end(cache_key)
+            print(f"[HALE Oracle] Cache hit - reusing verdict: {cached.get('verdict', 'UNKNOWN')}")
+            return copy.deepcopy(cached)
+        
         user_prompt = self.format_verification_request(contract_data)
         
         try:
             print("[HALE Oracle] Sending delivery to HALE Oracle (Gemini)...")
-            response = self.model.generate_content(user_prompt)
-            
-            response_text = response.text.strip()
+            response_text = self._generate_verdict_text(user_prompt)
             
             # Remove markdown code blocks if present
             if response_text.startswith('```'):
@@ -124,7 +239,7 @@ class HaleOracleCircle:
                 if json_start != -1 and json_end > json_start:
                     response_text = response_text[json_start:json_end]
             
-            verdict = json.loads(response_text)
+            verdict = _json_loads(response_text)
             
             print(f"[HALE Oracle] Verdict: {verdict.get('verdict', 'UNKNOWN')}")
             print(f"[HALE Oracle] Confidence: {verdict.get('confidence_score', 0)}%")
@@ -133,6 +248,11 @@ class HaleOracleCircle:
             if verdict.get('risk_flags'):
                 print(f"[HALE Oracle] Risk Flags: {', '.join(verdict.get('risk_flags', []))}")
             
+            if self._verdict_cache_size > 0:
+                self._verdict_cache[cache_key] = copy.deepcopy(verdict)
+                if len(self._verdict_cache) > self._verdict_cache_size:
+                    self._verdict_cache.popitem(last=False)
+            
             return verdict
             
         except json.JSONDecodeError as e:
@@ -156,6 +276,16 @@ class HaleOracleCircle:
                 "risk_flags": ["SYSTEM_ERROR"]
             }
     
+    def _fetch_tx_params(self, address: str) -> tuple:
+        """Fetch nonce, gas price and chain id concurrently (one RPC round-trip of wall time)."""
+        with ThreadPoolExecutor(max_workers=3) as pool:
+            nonce = pool.submit(self.web3.eth.get_transaction_count, address)
+            gas_price = pool.submit(lambda: self.web3.eth.gas_price)
+            if self._chain_id is None:
+                # Chain id never changes for a given RPC, fetch it once
+                self._chain_id = pool.submit(lambda: self.web3.eth.chain_id).result()
+            return nonce.result(), gas_price.result(), self._chain_id
+    
     def trigger_smart_contract_circle(self, verdict: Dict[str, Any], seller_address: str,
                                      contract_address: str, contract_abi: Dict[str, Any],
                                      function_name: str = "release") -> bool:
@@ -205,12 +335,13 @@ class HaleOracleCircle:
                 )
             
             # Encode transaction data
+            nonce, gas_price, chain_id = self._fetch_tx_params(self._checksum_wallet)
             transaction_data = function_call.build_transaction({
-                'from': self.wallet_address,
-                'nonce': self.web3.eth.get_transaction_count(self.wallet_address),
+                'from': self._checksum_wallet,
+                'nonce': nonce,
                 'gas': 200000,
-                'gasPrice': self.web3.eth.gas_price,
-                'chainId': self.web3.eth.chain_id
+                'gasPrice': gas_price,
+                'chainId': chain_id
             })
             
             # Use Circle to sign and send transaction
@@ -303,8 +434,8 @@ def main():
     
     # Load test example
     test_file = os.path.join(os.path.dirname(__file__), 'test_example.json')
-    with open(test_file, 'r') as f:
-        contract_data = json.load(f)
+    with open(test_file, 'rb') as f:
+        contract_data = _json_loads(f.read())
     
     # Process delivery
     seller_address = "0xSellerAddress123456789"
@@ -314,8 +445,7 @@ def main():
     contract_abi = None
     abi_file = os.path.join(os.path.dirname(__file__), 'escrow_abi.json')
     if os.path.exists(abi_file):
-        with open(abi_file, 'r') as f:
-            contract_abi = json.load(f)
+        contract_abi = _load_abi(abi_file)
     
     result = oracle.process_delivery(
         contract_data=contract_data,
@@ -328,7 +458,7 @@ def main():
     print("\n" + "="*60)
     print("FINAL RESULT")
     print("="*60)
-    print(json.dumps(result, indent=2))
+    print(_json_dumps(result, indent=True))
     
     return result
 
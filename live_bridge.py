@@ -5,16 +5,37 @@ import subprocess
 import tempfile
 import json
 import shutil
+import re
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+try:
+    import orjson
+except ImportError:  # optional speedup; stdlib json is the fallback
+    orjson = None
 
 # Paths
 IN_DIR = "audit_live_test/input"
-FRONTEND_BRIDGE_DIR = "frontend/public/pending_reviews"
-BRIDGE_INDEX = os.path.join(FRONTEND_BRIDGE_DIR, "index.json")
+# One {id}.json per review, in the directory HaleOracle.queue_for_review and /api/reviews use
+REVIEWS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "pending_reviews")
+# Larger drops are rejected before being read into memory
+MAX_DELIVERY_BYTES = 1024 * 1024
+# Files are handled concurrently; the sandbox subprocess releases the GIL while it waits
+MAX_WORKERS = int(os.getenv('HALE_WORKERS', '8'))
+
+# Sandbox interpreter and its scrubbed environment, resolved once at import
+PYTHON = sys.executable
+CLEAN_ENV = {"PATH": os.environ.get("PATH", "")}
+
+# Python code indicators, matched in a single pass over the raw bytes
+_EXEC_CODE_RE = re.compile(rb'def |import |print\(|class |if __name__ ==')
 
 class StandaloneSandbox:
-    def _is_executable_code(self, content: str) -> bool:
-        indicators = ['def ', 'import ', 'print(', 'class ', 'if __name__ ==']
-        return any(ind in content for ind in indicators)
+    def _is_executable_code(self, content) -> bool:
+        if isinstance(content, str):
+            content = content.encode('utf-8', 'ignore')
+        return _EXEC_CODE_RE.search(content) is not None
 
     def run_sandbox_test(self, code: str):
         wrapped_code = f"""
@@ -48,9 +69,7 @@ except Exception as e:
             temp_path = tf.name
         
         try:
-            # Clean env
-            clean_env = {"PATH": os.environ.get("PATH", "")}
-            result = subprocess.run([sys.executable, temp_path], capture_output=True, text=True, timeout=5, env=clean_env)
+            result = subprocess.run([PYTHON, temp_path], capture_output=True, text=True, timeout=5, env=CLEAN_ENV)
             
             if result.returncode == 0:
                 return {'success': True, 'output': result.stdout[:1000]}
@@ -59,77 +78,100 @@ except Exception as e:
         except subprocess.TimeoutExpired:
             return {'success': False, 'error': "Timeout"}
         finally:
-            if os.path.exists(temp_path):
+            try:
                 os.unlink(temp_path)
+            except FileNotFoundError:
+                pass
 
 def update_ui_bridge(transaction):
-    """Updates the static JSON file that the Frontend reads."""
+    """Writes the review to its own JSON file in the review queue."""
     try:
-        # Read existing
-        reviews = []
-        if os.path.exists(BRIDGE_INDEX):
-            with open(BRIDGE_INDEX, 'r') as f:
-                try:
-                    reviews = json.load(f)
-                except:
-                    reviews = []
-        
-        # Add new
-        reviews.insert(0, transaction)
+        if orjson:
+            review = orjson.dumps(transaction, option=orjson.OPT_INDENT_2)
+        else:
+            review = json.dumps(transaction, indent=2).encode()
         
-        # Save
-        with open(BRIDGE_INDEX, 'w') as f:
-            json.dump(reviews, f, indent=2)
+        # Unique temp file per write, renamed into place so readers never see a partial review
+        fd, tmp_path = tempfile.mkstemp(dir=REVIEWS_DIR, suffix=".tmp")
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(review)
+            os.replace(tmp_path, os.path.join(REVIEWS_DIR, f"{transaction['id']}.json"))
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
         print(f"✅ UI Updated: {transaction['id']} added to queue.")
     except Exception as e:
         print(f"❌ Failed to update UI bridge: {e}")
 
+def handle_file(oracle, f, f_path):
+    """Sandbox one dropped file and queue the result for the UI."""
+    try:
+        print(f"\n📄 Detected: {f}")
+        path = Path(f_path)
+        if path.stat().st_size > MAX_DELIVERY_BYTES:
+            print(f"⚠️  Skipping {f}: larger than {MAX_DELIVERY_BYTES} bytes.")
+            os.remove(f_path)
+            return
+        data = path.read_bytes()
+        content = data.decode('utf-8', 'replace')
+        
+        # Check Sandbox
+        res = oracle.run_sandbox_test(content)
+        
+        # Create review object for UI; the file name keeps ids unique when drops share a second
+        tx_id = f"tx_{int(time.time())}_{f}"
+        review_obj = {
+            "id": tx_id,
+            "timestamp": time.time(),
+            "status": "pending",
+            "contract_data": {
+                "transaction_id": tx_id,
+                "Delivery_Content": content[:100] + "..."
+            },
+            "ai_verdict": {
+                "verdict": "PENDING_REVIEW" if res['success'] else "FAIL",
+                "confidence_score": 75 if res['success'] else 0, # Borderline if passed sandbox
+                "reasoning": f"Sandbox Result: {'PASS' if res['success'] else 'FAIL - ' + res.get('error')}",
+                "risk_flags": [] if res['success'] else ["RUNTIME_ERROR"]
+            }
+        }
+        
+        print(f"🛡️ Sandbox: {'PASS' if res['success'] else 'FAIL'}")
+        update_ui_bridge(review_obj)
+        
+        os.remove(f_path)
+    except Exception as e:
+        print(f"Error: {e}")
+
 def main():
-    if not os.path.exists(IN_DIR):
-        os.makedirs(IN_DIR)
+    os.makedirs(IN_DIR, exist_ok=True)
+    os.makedirs(REVIEWS_DIR, exist_ok=True)
         
     oracle = StandaloneSandbox()
+    pool = ThreadPoolExecutor(max_workers=MAX_WORKERS)
+    # Files already handed to the pool, so the next poll doesn't resubmit them
+    in_flight = set()
+    in_flight_lock = threading.Lock()
+    
+    def release(f):
+        with in_flight_lock:
+            in_flight.discard(f)
+    
     print("👁️  LIVE BRIDGE ACTIVE: Watching for files...")
     
     while True:
         try:
-            files = [f for f in os.listdir(IN_DIR) if not f.startswith('.')]
-            if not files:
-                time.sleep(1)
-                continue
+            with in_flight_lock, os.scandir(IN_DIR) as it:
+                entries = [e for e in it
+                           if not e.name.startswith('.') and e.is_file() and e.name not in in_flight]
+                in_flight.update(e.name for e in entries)
             
-            for f in files:
-                f_path = os.path.join(IN_DIR, f)
-                print(f"\n📄 Detected: {f}")
-                with open(f_path, 'r') as file:
-                    content = file.read()
-                
-                # Check Sandbox
-                res = oracle.run_sandbox_test(content)
-                
-                # Create review object for UI
-                tx_id = f"tx_{int(time.time())}"
-                review_obj = {
-                    "id": tx_id,
-                    "timestamp": time.time(),
-                    "status": "pending",
-                    "contract_data": {
-                        "transaction_id": tx_id,
-                        "Delivery_Content": content[:100] + "..."
-                    },
-                    "ai_verdict": {
-                        "verdict": "PENDING_REVIEW" if res['success'] else "FAIL",
-                        "confidence_score": 75 if res['success'] else 0, # Borderline if passed sandbox
-                        "reasoning": f"Sandbox Result: {'PASS' if res['success'] else 'FAIL - ' + res.get('error')}",
-                        "risk_flags": [] if res['success'] else ["RUNTIME_ERROR"]
-                    }
-                }
-                
-                print(f"🛡️ Sandbox: {'PASS' if res['success'] else 'FAIL'}")
-                update_ui_bridge(review_obj)
-                
-                os.remove(f_path)
-                
+            for entry in entries:
+                future = pool.submit(handle_file, oracle, entry.name, entry.path)
+                future.add_done_callback(lambda _, f=entry.name: release(f))
+            
+            time.sleep(1)
         except Exception as e:
             print(f"Error: {e}")
             time.sleep(1)
@@ -2,6 +2,11 @@ import os
 import time
 import sys
 import json
+import hashlib
+import collections
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
 from hale_oracle_backend import HaleOracle
 from dotenv import load_dotenv
 
@@ -9,10 +14,84 @@ from dotenv import load_dotenv
 env_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), '.env')
 load_dotenv(dotenv_path=env_path)
 
+# Batching: up to BATCH_SIZE files dropped within BATCH_WINDOW_MS share one Gemini request
+BATCH_SIZE = int(os.getenv('HALE_BATCH_SIZE', '8'))
+BATCH_WINDOW_MS = int(os.getenv('HALE_BATCH_WINDOW_MS', '500'))
+
+# Larger drops are rejected before being read into memory (keeps the Gemini prompt bounded)
+MAX_DELIVERY_BYTES = 1024 * 1024
+
+# Batches are audited concurrently; Gemini calls release the GIL while waiting on the network
+MAX_WORKERS = int(os.getenv('HALE_WORKERS', '8'))
+
+# Keeps each file's result block together when workers finish at the same time
+_print_lock = threading.Lock()
+
+# Recently seen delivery hashes -> result, so re-dropped identical files skip the work
+_SEEN = collections.OrderedDict()
+_SEEN_MAX = 4096
+_seen_lock = threading.Lock()
+# Verdicts produced by error/quota fallbacks are retried rather than cached
+_UNCACHEABLE_FLAGS = {"SYSTEM_ERROR", "JSON_PARSE_ERROR", "QUOTA_EXCEEDED_FALLBACK"}
+
 # DISABLE Simulation Mode to use Real Gemini API
 if 'SIMULATION_MODE' in os.environ:
     del os.environ['SIMULATION_MODE']
 
+def report_verdict(f, verdict):
+    """Print one file's verdict block."""
+    v = verdict['verdict']
+    score = verdict['confidence_score']
+    
+    with _print_lock:
+        print(f"\n📄 {f}")
+        if v == "PASS":
+            print(f"✅ VERDICT: PASS (Confidence: {score}%)")
+            print("💰 FUNDS RELEASED")
+        elif v == "PENDING_REVIEW":
+            print(f"⚠️  VERDICT: PENDING HUMAN REVIEW (Confidence: {score}%)")
+            print("🛑 FUNDS PROTECTED (HITL Queue)")
+        else:
+            print(f"❌ VERDICT: FAIL")
+            print("🛑 FUNDS REFUNDED")
+            
+        print(f"📝 REASONING: {verdict['reasoning']}")
+        if verdict.get('risk_flags'):
+             print(f"🚩 RISK FLAGS: {verdict['risk_flags']}")
+        
+        print("-" * 50)
+        sys.stdout.flush()
+
+def remember_verdict(digest, verdict):
+    """Cache a verdict by content hash, unless it came from an error fallback or awaits human review."""
+    # A reused PENDING_REVIEW would skip the HITL queueing done inside verify_delivery
+    if verdict.get('verdict') == "PENDING_REVIEW":
+        return
+    if _UNCACHEABLE_FLAGS.intersection(verdict.get('risk_flags') or []):
+        return
+    with _seen_lock:
+        _SEEN[digest] = verdict
+        if len(_SEEN) > _SEEN_MAX:
+            _SEEN.popitem(last=False)
+
+def audit_batch(oracle, batch):
+    """Verify a batch of (name, path, payload, digest) drops and report each verdict."""
+    try:
+        print(f"🔍 Running HALE Forensic Audit on {len(batch)} file(s) (Calling Gemini)...")
+        verdicts = oracle.verify_deliveries_batch([data for _, _, data, _ in batch])
+        
+        for (f, f_path, _, digest), verdict in zip(batch, verdicts):
+            remember_verdict(digest, verdict)
+            report_verdict(f, verdict)
+            
+            # Remove file to reset
+            try:
+                os.remove(f_path)
+            except Exception:
+                pass
+    except Exception as e:
+        print(f"Audit Error: {e}")
+
 def main():
     in_dir = "audit_live_test/input"
     api_key = os.getenv('GEMINI_API_KEY')
@@ -33,27 +112,61 @@ def main():
     sys.stdout.flush()
     
     # Create input dir if missing
-    if not os.path.exists(in_dir):
-        os.makedirs(in_dir)
+    os.makedirs(in_dir, exist_ok=True)
+    
+    pool = ThreadPoolExecutor(max_workers=MAX_WORKERS)
+    # Files already handed to the pool, so the next poll doesn't resubmit them
+    in_flight = set()
+    in_flight_lock = threading.Lock()
+    
+    def release(names):
+        with in_flight_lock:
+            in_flight.difference_update(names)
+    
+    def pending_files():
+        with in_flight_lock, os.scandir(in_dir) as it:
+            return [e for e in it
+                    if not e.name.startswith('.') and e.is_file() and e.name not in in_flight]
     
     while True:
         try:
-            files = [f for f in os.listdir(in_dir) if not f.startswith('.')]
+            files = pending_files()
             if not files:
                 time.sleep(1)
                 continue
-                
-            for f in files:
-                f_path = os.path.join(in_dir, f)
+            
+            # Give simultaneous drops a moment to land so they share one Gemini call
+            if len(files) < BATCH_SIZE:
+                time.sleep(BATCH_WINDOW_MS / 1000)
+                files = pending_files()
+            
+            batch = []
+            for entry in files[:BATCH_SIZE]:
+                f, f_path = entry.name, entry.path
                 print(f"\n📄 [NEW DROP] Detected file: {f}")
                 
                 try:
-                    with open(f_path, 'r') as file:
-                        content = file.read()
+                    path = Path(f_path)
+                    if path.stat().st_size > MAX_DELIVERY_BYTES:
+                        print(f"⚠️  Skipping {f}: larger than {MAX_DELIVERY_BYTES} bytes.")
+                        os.remove(f_path)
+                        continue
+                    raw = path.read_bytes()
                 except Exception as e:
                     print(f"❌ Error reading file: {e}")
                     continue
                 
+                digest = hashlib.blake2b(raw, digest_size=16).digest()
+                with _seen_lock:
+                    cached = _SEEN.get(digest)
+                    if cached is not None:
+                        _SEEN.move_to_end(digest)
+                if cached is not None:
+                    print("♻️  Identical delivery seen before. Reusing verdict (no Gemini call).")
+                    report_verdict(f, cached)
+                    os.remove(f_path)
+                    continue
+                
                 # Construct Payload
                 tx_id = f"tx_{int(time.time())}_{f}"
                 
@@ -61,38 +174,19 @@ def main():
                     "transaction_id": tx_id,
                     "Contract_Terms": "Standard Python Code Delivery. Must be safe and correct.",
                     "Acceptance_Criteria": ["Must run without error", "Must be valid Python"],
-                    "Delivery_Content": content
+                    "Delivery_Content": raw.decode('utf-8', 'replace')
                 }
-                
-                print("🔍 Running HALE Forensic Audit (Calling Gemini)...")
-                verdict = oracle.verify_delivery(data)
-                
-                # Pretty Print Result
-                v = verdict['verdict']
-                score = verdict['confidence_score']
-                
-                if v == "PASS":
-                    print(f"✅ VERDICT: PASS (Confidence: {score}%)")
-                    print("💰 FUNDS RELEASED")
-                elif v == "PENDING_REVIEW":
-                    print(f"⚠️  VERDICT: PENDING HUMAN REVIEW (Confidence: {score}%)")
-                    print("🛑 FUNDS PROTECTED (HITL Queue)")
-                else:
-                    print(f"❌ VERDICT: FAIL")
-                    print("🛑 FUNDS REFUNDED")
-                    
-                print(f"📝 REASONING: {verdict['reasoning']}")
-                if verdict.get('risk_flags'):
-                     print(f"🚩 RISK FLAGS: {verdict['risk_flags']}")
-                
-                print("-" * 50)
-                sys.stdout.flush()
-                
-                # Remove file to reset
-                try:
-                    os.remove(f_path)
-                except:
-                    pass
+                batch.append((f, f_path, data, digest))
+            
+            if not batch:
+                time.sleep(1)
+                continue
+            
+            names = [f for f, _, _, _ in batch]
+            with in_flight_lock:
+                in_flight.update(names)
+            future = pool.submit(audit_batch, oracle, batch)
+            future.add_done_callback(lambda _, names=names: release(names))
         except Exception as e:
             print(f"Loop Error: {e}")
             time.sleep(1)
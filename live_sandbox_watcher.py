@@ -1,17 +1,16 @@
 import os
 import time
 import sys
+from pathlib import Path
 from hale_oracle_backend import HaleOracle
 
+# Larger drops are rejected before being read into memory
+MAX_DELIVERY_BYTES = 1024 * 1024
+
 def main():
     in_dir = "audit_live_test/input"
-    # We init oracle just to get access to the Sandbox method
-    try:
-        oracle = HaleOracle("dummy_key")
-    except:
-        # Fallback if init fails due to network checks
-        oracle = HaleOracle("dummy_key")
-        oracle.simulation_mode = True 
+    # We init oracle just to get access to the Sandbox method (no Gemini/network setup)
+    oracle = HaleOracle("dummy_key", simulation_mode=True)
 
     print(f"👁️  LIVE SANDBOX AUDITOR ACTIVE")
     print(f"⚠️ Note: Network is air-gapped. AI analysis skipped.")
@@ -21,23 +20,27 @@ def main():
     sys.stdout.flush()
     
     # Create input dir if missing
-    if not os.path.exists(in_dir):
-        os.makedirs(in_dir)
+    os.makedirs(in_dir, exist_ok=True)
     
     while True:
         try:
-            files = [f for f in os.listdir(in_dir) if not f.startswith('.')]
-            if not files:
+            with os.scandir(in_dir) as it:
+                entries = [e for e in it if not e.name.startswith('.') and e.is_file()]
+            if not entries:
                 time.sleep(1)
                 continue
                 
-            for f in files:
-                f_path = os.path.join(in_dir, f)
+            for entry in entries:
+                f, f_path = entry.name, entry.path
                 print(f"\n📄 [NEW DROP] Detected file: {f}")
                 
                 try:
-                    with open(f_path, 'r') as file:
-                        content = file.read()
+                    path = Path(f_path)
+                    if path.stat().st_size > MAX_DELIVERY_BYTES:
+                        print(f"⚠️  Skipping {f}: larger than {MAX_DELIVERY_BYTES} bytes.")
+                        os.remove(f_path)
+                        continue
+                    data = path.read_bytes()
                 except Exception as e:
                     print(f"❌ Error reading file: {e}")
                     continue
@@ -45,13 +48,13 @@ def main():
                 print("🔍 Analyzing Code Safety...")
                 
                 # Check 1: Is it python?
-                if not oracle._is_executable_code(content):
+                if not oracle._is_executable_code(data):
                     print("ℹ️  Content is not executable code. Skipping Sandbox.")
                 else:
                     # Check 2: Run Hardened Sandbox
                     print("🛡️  Spinning up Isolated Sandbox...")
                     start_t = time.time()
-                    res = oracle.run_sandbox_test(content)
+                    res = oracle.run_sandbox_test(data.decode('utf-8', 'replace'))
                     duration = time.time() - start_t
                     
                     if res['success']:
@@ -2,68 +2,370 @@ import os
 import json
 import time
 import requests
-import subprocess
-import tempfile
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 import sys
+import builtins
+import io
+import multiprocessing
+import traceback
+import copy
+import hashlib
+import shelve
+import math
+import re
+import ast
 from dotenv import load_dotenv
 
+try:
+    import orjson
+except ImportError:  # optional speedup; stdlib json is the fallback
+    orjson = None
+
+# Verdicts for previously seen contract_data, persisted across runs
+CACHE_PATH = "hale_verdict_cache.db"
+
+# Near-duplicate prompts (cosine similarity of embeddings) share a verdict
+EMBED_URL = "https://generativelanguage.googleapis.com/v1beta/models/text-embedding-004:embedContent?key={key}"
+SIMILARITY_THRESHOLD = 0.92
+
+# A FAIL is final, so the stream can be dropped as soon as it appears
+_FAIL_RE = re.compile(r'"verdict"\s*:\s*"FAIL"')
+_SCORE_RE = re.compile(r'"confidence_score"\s*:\s*(\d+)')
+
+# Verdict object inside a ```json fence, or the outermost bare object
+JSON_RE = re.compile(r"```(?:json)?\s*(\{.*?\})\s*```|(\{.*\})", re.DOTALL)
+
+# Modules a delivery may not touch; caught on the AST before anything is executed
+_BLOCKED_MODULES = {"os", "subprocess", "socket", "importlib", "builtins"}
+# Names that import modules chosen at runtime (e.g. __import__('o' + 's')), out of the check's reach
+_BLOCKED_NAMES = {"__import__"}
+
+
+def _ast_prescan(code):
+    """Statically inspect a delivery.
+
+    Returns (sandbox_needed, violation). violation is a reason string when the
+    code must FAIL without running; sandbox_needed is False when the module only
+    defines plain functions and nothing would execute at import.
+    """
+    try:
+        tree = ast.parse(code)
+    except SyntaxError as e:
+        return False, f"Code does not parse: {e}"
+
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Import):
+            names = [alias.name for alias in node.names]
+        elif isinstance(node, ast.ImportFrom):
+            names = [node.module or ""]
+        elif isinstance(node, ast.Attribute) and isinstance(node.value, ast.Name):
+            names = [node.value.id]
+        elif isinstance(node, ast.Name) and node.id in _BLOCKED_NAMES:
+            return False, f"Dynamic import via '{node.id}'"
+        else:
+            continue
+        for name in names:
+            if name.split(".")[0] in _BLOCKED_MODULES:
+                return False, f"Use of restricted module '{name.split('.')[0]}'"
+
+    for stmt in tree.body:
+        if isinstance(stmt, (ast.Import, ast.ImportFrom, ast.Pass)):
+            continue
+        if isinstance(stmt, ast.Expr) and isinstance(stmt.value, ast.Constant):
+            continue  # docstring
+        if (isinstance(stmt, (ast.FunctionDef, ast.AsyncFunctionDef)) and not stmt.decorator_list
+                and all(isinstance(d, ast.Constant) for d in stmt.args.defaults + stmt.args.kw_defaults if d)):
+            continue
+        return True, None
+    return False, None
+
+# Deliveries run with the full builtins; the worker process is the boundary, not a builtins
+# filter (which code can always get around). Each worker drops the parent's environment,
+# gives up root for SANDBOX_UID when started as root, moves into its own network namespace
+# where the kernel allows it (no connections out), may not write data to files, and runs
+# under CPU and memory limits.
+SANDBOX_ENV = {"PATH": os.environ.get("PATH", "")}
+SANDBOX_UID = 65534  # nobody
+SANDBOX_TIMEOUT = 3
+SANDBOX_MEMORY = 256 << 20
+# Only the tail of stderr is reported; stdout is discarded
+SANDBOX_STDERR_MAX = 4096
+
+
+class _TailBuffer(io.StringIO):
+    """Text sink that keeps only the last SANDBOX_STDERR_MAX characters."""
+
+    def write(self, text):
+        n = super().write(text)
+        if self.tell() > 2 * SANDBOX_STDERR_MAX:
+            tail = self.getvalue()[-SANDBOX_STDERR_MAX:]
+            self.seek(0)
+            self.truncate()
+            super().write(tail)
+        return n
+
+    def tail(self):
+        return self.getvalue()[-SANDBOX_STDERR_MAX:]
+
+# Sandbox workers fork from a warm forkserver instead of starting a fresh interpreter.
+# maxtasksperchild=1: every delivery gets a clean process, nothing leaks between runs.
+_sandbox_pool = None
+
+
+def _get_sandbox_pool():
+    global _sandbox_pool
+    if _sandbox_pool is None:
+        ctx = multiprocessing.get_context("forkserver")
+        ctx.set_forkserver_preload(["json", "ast"])
+        _sandbox_pool = ctx.Pool(2, maxtasksperchild=1)
+    return _sandbox_pool
+
+
+def _reset_sandbox_pool():
+    """Kill the workers (e.g. one is stuck on a hung delivery)."""
+    global _sandbox_pool
+    if _sandbox_pool is not None:
+        _sandbox_pool.terminate()
+        _sandbox_pool = None
+
+
+def _confine_worker():
+    """Apply the sandbox limits to the current pool worker (each one the kernel refuses is skipped)."""
+    os.environ.clear()
+    os.environ.update(SANDBOX_ENV)
+    if hasattr(os, "getuid") and os.getuid() == 0:
+        try:
+            os.setgroups([])
+            os.setgid(SANDBOX_UID)
+            os.setuid(SANDBOX_UID)
+        except OSError:
+            pass
+    try:
+        os.unshare(os.CLONE_NEWUSER | os.CLONE_NEWNET)
+    except (AttributeError, OSError):
+        pass  # Python < 3.12, or user namespaces disabled on this host
+    try:
+        import resource
+    except ImportError:
+        return
+    for limit, value in ((resource.RLIMIT_CPU, SANDBOX_TIMEOUT),
+                         (resource.RLIMIT_AS, SANDBOX_MEMORY),
+                         (resource.RLIMIT_FSIZE, 0)):
+        try:
+            resource.setrlimit(limit, (value, value))
+        except (ValueError, OSError):
+            pass
+
+
+def _exec_user_code(src):
+    """Run a delivery inside a pool worker. Returns (success, stderr)."""
+    err = _TailBuffer()
+    sys.stdout, sys.stderr = open(os.devnull, "w"), err
+    _confine_worker()
+    try:
+        exec(compile(src, "<sandbox>", "exec"), {"__builtins__": builtins, "__name__": "__main__"})
+        return True, ""
+    except SystemExit as e:
+        return e.code in (None, 0), err.tail()
+    except BaseException:
+        err.write(traceback.format_exc())
+        return False, err.tail()
+    finally:
+        sys.stdout.close()
+        sys.stdout, sys.stderr = sys.__stdout__, sys.__stderr__
+
+
+def _run_in_sandbox(src):
+    """Returns (success, stderr) for a delivery, killing it after SANDBOX_TIMEOUT seconds."""
+    try:
+        return _get_sandbox_pool().apply_async(_exec_user_code, (src,)).get(timeout=SANDBOX_TIMEOUT)
+    except multiprocessing.TimeoutError:
+        _reset_sandbox_pool()
+        raise TimeoutError(f"Execution timed out after {SANDBOX_TIMEOUT}s")
+
+# Fixed protocol preamble, sent as the system instruction ahead of each prompt
+SYSTEM_INSTRUCTION = (
+    "You are HALE Oracle. Return JSON ONLY.\n"
+    "Protocol: Any security risk or unmet criteria = FAIL.\n"
+    'Output Schema: {"verdict": "PASS"|"FAIL", "confidence_score": 0-100, "release_funds": bool, "reasoning": "...", "risk_flags": []}'
+)
+MODEL = "gemini-1.5-flash"
+# Code the sandbox will execute is screened by a smaller model, since the sandbox has the final say
+CODE_MODEL = "gemini-1.5-flash-8b"
+
 # We implement a "Lightweight" version of the Oracle for this walkthrough
 # to avoid the gRPC/SDK permission issues in this specific environment.
 class LightOracle:
     def __init__(self, api_key):
         self.api_key = api_key
-        self.url = f"https://generativelanguage.googleapis.com/v1beta/models/gemini-1.5-flash:generateContent?key={self.api_key}"
+        self.model_url_fmt = f"https://generativelanguage.googleapis.com/v1beta/models/{{model}}:streamGenerateContent?alt=sse&key={self.api_key}"
+        # Keep-alive session so repeat calls reuse the TLS connection
+        self.session = requests.Session()
+        retry = Retry(total=3, backoff_factor=0.2, status_forcelist=[429, 500, 502, 503, 504],
+                      allowed_methods=None)
+        self.session.mount("https://", HTTPAdapter(pool_connections=10, pool_maxsize=10, max_retries=retry))
+        self._cache: dict[str, dict] = {}
+        try:
+            with shelve.open(CACHE_PATH) as db:
+                self._cache.update(db)
+        except Exception as e:
+            print(f"[HALE] Verdict cache unavailable: {e}")
+        # Normalized prompt embeddings and the verdicts they produced
+        self._vectors: list[list[float]] = []
+        self._vector_verdicts: list[dict] = []
+
+    def _remember(self, key, verdict):
+        self._cache[key] = copy.deepcopy(verdict)
+        try:
+            with shelve.open(CACHE_PATH) as db:
+                db[key] = verdict
+        except Exception as e:
+            print(f"[HALE] Could not persist verdict: {e}")
+
+    def _embed(self, contract_data):
+        """Return the normalized embedding of the contract, or None on failure."""
+        text = "\n".join([
+            str(contract_data['Contract_Terms']),
+            str(contract_data['Acceptance_Criteria']),
+            str(contract_data['Delivery_Content'])
+        ])
+        payload = {"model": "models/text-embedding-004", "content": {"parts": [{"text": text}]}}
+        try:
+            response = self.session.post(EMBED_URL.format(key=self.api_key), json=payload, timeout=(3, 30))
+            values = response.json()['embedding']['values']
+        except Exception as e:
+            print(f"[HALE] Embedding failed, skipping semantic cache: {e}")
+            return None
+        norm = math.sqrt(sum(v * v for v in values)) or 1.0
+        return [v / norm for v in values]
+
+    def _semantic_lookup(self, vector):
+        """Return the verdict of the most similar cached prompt above the threshold."""
+        best, best_score = None, SIMILARITY_THRESHOLD
+        for cached, verdict in zip(self._vectors, self._vector_verdicts):
+            score = sum(a * b for a, b in zip(vector, cached))
+            if score >= best_score:
+                best, best_score = verdict, score
+        return best
+
+    def route_prompt(self, contract_data, prescan=None):
+        """Pick the model for a delivery: the smaller one only when the sandbox will run the code.
+
+        prescan is the (sandbox_needed, violation) pair from _ast_prescan, if already computed.
+        """
+        content = contract_data['Delivery_Content']
+        if "def " not in content:
+            return MODEL
+        sandbox_needed, violation = prescan or _ast_prescan(content)
+        # Function-only modules never reach the sandbox, so their PASS rests on the model alone
+        return CODE_MODEL if sandbox_needed and not violation else MODEL
+
+    def _stream_text(self, model, payload, headers):
+        """Stream the Gemini reply. Returns (text, stopped_early_on_fail)."""
+        text = ""
+        with self.session.post(self.model_url_fmt.format(model=model), json=payload, headers=headers,
+                               timeout=(3, 30), stream=True) as response:
+            response.raise_for_status()
+            for line in response.iter_lines(decode_unicode=True):
+                if not line or not line.startswith("data:"):
+                    continue
+                chunk = json.loads(line[5:])
+                for part in chunk['candidates'][0]['content'].get('parts', []):
+                    text += part.get('text', '')
+                if _FAIL_RE.search(text):
+                    return text, True
+        return text, False
 
     def verify(self, contract_data):
+        # Identical submissions reuse the earlier verdict (no Gemini round-trip)
+        key = hashlib.sha256(json.dumps(contract_data, sort_keys=True).encode()).hexdigest()
+        if key in self._cache:
+            return copy.deepcopy(self._cache[key])
+
+        # Code deliveries always go through the sandbox, so only prose is matched semantically
+        vector = None
+        if "def " not in contract_data['Delivery_Content']:
+            vector = self._embed(contract_data)
+            if vector is not None:
+                cached = self._semantic_lookup(vector)
+                if cached is not None:
+                    print("[HALE] Near-duplicate delivery found. Reusing cached verdict.")
+                    return copy.deepcopy(cached)
+
+        # Only the dynamic part goes in the prompt; the static preamble comes first as the system instruction
         prompt = f"""
-        You are HALE Oracle. Return JSON ONLY.
         Terms: {contract_data['Contract_Terms']}
         Criteria: {contract_data['Acceptance_Criteria']}
         Code: {contract_data['Delivery_Content']}
-        
-        Protocol: Any security risk or unmet criteria = FAIL.
-        Output Schema: {{"verdict": "PASS"|"FAIL", "confidence_score": 0-100, "release_funds": bool, "reasoning": "...", "risk_flags": []}}
         """
         
-        payload = {"contents": [{"parts": [{"text": prompt}]}]}
+        # Parsed once: routes the model here and gates the sandbox below
+        prescan = _ast_prescan(contract_data['Delivery_Content']) if "def " in contract_data['Delivery_Content'] else None
+        model = self.route_prompt(contract_data, prescan)
+        payload = {
+            "systemInstruction": {"parts": [{"text": SYSTEM_INSTRUCTION}]},
+            "contents": [{"role": "user", "parts": [{"text": prompt}]}]
+        }
         headers = {'Content-Type': 'application/json'}
         
-        response = requests.post(self.url, json=payload, headers=headers)
-        data = response.json()
-        text = data['candidates'][0]['content']['parts'][0]['text']
+        text, early_fail = self._stream_text(model, payload, headers)
+        # A truncated stream or a sandbox infrastructure error says nothing lasting about the input
+        cacheable = not early_fail
         
-        # Clean JSON
-        if "```json" in text:
-            text = text.split("```json")[1].split("```")[0]
-        elif "```" in text:
-             text = text.split("```")[1].split("```")[0]
-             
-        verdict = json.loads(text.strip())
+        if early_fail:
+            # Connection already closed; the rest of the reply is not needed for a FAIL
+            score = _SCORE_RE.search(text)
+            verdict = {
+                "verdict": "FAIL",
+                "confidence_score": int(score.group(1)) if score else 0,
+                "release_funds": False,
+                "reasoning": "Gemini returned FAIL (stream closed early, full reasoning not retrieved).",
+                "risk_flags": []
+            }
+        else:
+            # Clean JSON (single regex pass)
+            m = JSON_RE.search(text)
+            if m:
+                text = m.group(1) or m.group(2)
+                 
+            verdict = orjson.loads(text.strip()) if orjson else json.loads(text.strip())
         
         # --- SAFEGUARD: SANDBOX ---
-        if verdict['verdict'] == 'PASS' and "def " in contract_data['Delivery_Content']:
+        sandbox_needed = False
+        if verdict['verdict'] == 'PASS' and prescan is not None:
+             sandbox_needed, violation = prescan
+             if violation:
+                  verdict['verdict'] = 'FAIL'
+                  verdict['release_funds'] = False
+                  verdict['reasoning'] += f"\nSTATIC CHECK OVERRIDE: {violation}"
+                  verdict['risk_flags'].append("STATIC_ANALYSIS_BLOCK")
+        if sandbox_needed:
              print("[HALE] Verifying code in sandbox...")
-             with tempfile.NamedTemporaryFile(suffix='.py', mode='w', delete=False) as tf:
-                 tf.write(contract_data['Delivery_Content'])
-                 tmp = tf.name
-             
              try:
-                 res = subprocess.run([sys.executable, tmp], capture_output=True, text=True, timeout=3)
-                 if res.returncode != 0:
+                 success, stderr = _run_in_sandbox(contract_data['Delivery_Content'])
+                 if not success:
                       verdict['verdict'] = 'FAIL'
-                      verdict['reasoning'] += f"\nSANDBOX OVERRIDE: Code crashed with: {res.stderr}"
+                      verdict['reasoning'] += f"\nSANDBOX OVERRIDE: Code crashed with: {stderr}"
                       verdict['risk_flags'].append("RUNTIME_ERROR")
              except Exception as e:
                   verdict['verdict'] = 'FAIL'
                   verdict['reasoning'] += f"\nSANDBOX OVERRIDE: {str(e)}"
-             finally:
-                  os.unlink(tmp)
+                  # A timeout is the code's own doing; anything else is the sandbox failing
+                  cacheable = isinstance(e, TimeoutError)
         
         # --- SAFEGUARD: HITL ---
         if 70 <= verdict['confidence_score'] < 90 and verdict['verdict'] == 'PASS':
              print("[HALE] Borderline confidence detected. Moving to HITL Queue.")
              verdict['verdict'] = 'PENDING_REVIEW'
              verdict['release_funds'] = False
+        
+        # HITL state must stay live, so borderline verdicts are never cached
+        if cacheable and verdict['verdict'] != 'PENDING_REVIEW':
+            self._remember(key, verdict)
+            if vector is not None:
+                self._vectors.append(vector)
+                self._vector_verdicts.append(copy.deepcopy(verdict))
              
         return verdict
 
@@ -21,19 +21,38 @@ def run_live_walkthrough():
     print("="*60)
     print("\nIn this test, we will submit three types of deliveries to see how the HALE safeguards react.")
 
-    # --- SCENARIO 1: THE "PERFECT" DELIVERY ---
-    print("\n" + "-"*40)
-    print("🔹 SCENARIO 1: High-Confidence Pass")
-    print("Goal: Verify that a clean, working delivery flows through automatically.")
-    
     perfect_delivery = {
         "transaction_id": f"tx_perfect_{int(time.time())}",
         "Contract_Terms": "Create a Python function that adds two numbers and returns the result.",
         "Acceptance_Criteria": ["Must be a function named 'add'", "Must handle integers", "Must return the sum"],
         "Delivery_Content": "def add(a, b):\n    return int(a) + int(b)\n\n# Verification test\nresult = add(10, 20)\nprint(f\"Test Sum: {result}\")"
     }
+
+    tricky_delivery = {
+        "transaction_id": f"tx_tricky_{int(time.time())}",
+        "Contract_Terms": "Create a script that lists the first 5 elements of a list.",
+        "Acceptance_Criteria": ["Must use Python", "Must handle a list of length 3 without crashing"],
+        "Delivery_Content": "def list_elements(data):\n    # This looks correct to AI logic, but will fail if list is too short\n    for i in range(5):\n        print(data[i])\n\n# The seller says it works, but didn't handle IndexErrors\nlist_elements([1, 2, 3])"
+    }
+
+    borderline_delivery = {
+        "transaction_id": f"tx_hitl_{int(time.time())}",
+        "Contract_Terms": "Create a script to calculate area of a circle. Use pi = 3.14.",
+        "Acceptance_Criteria": ["Must calculate area correctly", "Must use a variable for radius"],
+        "Delivery_Content": "import math\nr = 5\n# Note: Seller used math.pi instead of the requested 3.14 exactly.\na = math.pi * r**2\nprint(a)"
+    }
+
+    # One Gemini request covers all three cases; sandbox/HITL still run per case
+    print("\nRunning audits...")
+    result1, result2, result3 = oracle.verify_deliveries_batch(
+        [perfect_delivery, tricky_delivery, borderline_delivery]
+    )
+
+    # --- SCENARIO 1: THE "PERFECT" DELIVERY ---
+    print("\n" + "-"*40)
+    print("🔹 SCENARIO 1: High-Confidence Pass")
+    print("Goal: Verify that a clean, working delivery flows through automatically.")
     
-    result1 = oracle.verify_delivery(perfect_delivery)
     print(f"VERDICT: {result1['verdict']}")
     print(f"CONFIDENCE: {result1['confidence_score']}%")
     print(f"REASONING Snippet: {result1['reasoning'][:100]}...")
@@ -43,15 +62,6 @@ def run_live_walkthrough():
     print("🔹 SCENARIO 2: The 'AI-Tricker' (Broken Code)")
     print("Goal: Submit code that LOOKS correct to the AI audit, but fails at RUNTIME.")
     
-    tricky_delivery = {
-        "transaction_id": f"tx_tricky_{int(time.time())}",
-        "Contract_Terms": "Create a script that lists the first 5 elements of a list.",
-        "Acceptance_Criteria": ["Must use Python", "Must handle a list of length 3 without crashing"],
-        "Delivery_Content": "def list_elements(data):\n    # This looks correct to AI logic, but will fail if list is too short\n    for i in range(5):\n        print(data[i])\n\n# The seller says it works, but didn't handle IndexErrors\nlist_elements([1, 2, 3])"
-    }
-
-    print("Running audit...")
-    result2 = oracle.verify_delivery(tricky_delivery)
     print(f"VERDICT: {result2['verdict']}")
     print(f"REASONING: {result2['reasoning']}")
     print(f"RISK FLAGS: {result2.get('risk_flags', [])}")
@@ -62,15 +72,6 @@ def run_live_walkthrough():
     print("🔹 SCENARIO 3: Borderline Confidence (HITL Queue)")
     print("Goal: Submit code that is functional but slightly messy or ambiguous, causing AI confidence to drop.")
     
-    borderline_delivery = {
-        "transaction_id": f"tx_hitl_{int(time.time())}",
-        "Contract_Terms": "Create a script to calculate area of a circle. Use pi = 3.14.",
-        "Acceptance_Criteria": ["Must calculate area correctly", "Must use a variable for radius"],
-        "Delivery_Content": "import math\nr = 5\n# Note: Seller used math.pi instead of the requested 3.14 exactly.\na = math.pi * r**2\nprint(a)"
-    }
-
-    print("Running audit...")
-    result3 = oracle.verify_delivery(borderline_delivery)
     print(f"VERDICT: {result3['verdict']}")
     print(f"CONFIDENCE: {result3['confidence_score']}%")
     
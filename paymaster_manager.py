@@ -6,14 +6,227 @@ Handles gasless transactions using paymaster contracts
 
 import os
 import json
-from typing import Dict, Any, Optional
+import functools
+import queue
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Any, List, Optional
+from hexbytes import HexBytes
 from web3 import Web3
+from web3.datastructures import AttributeDict
+from web3.exceptions import TimeExhausted, TransactionNotFound
+from web3._utils.method_formatters import receipt_formatter
 from eth_account import Account
+from eth_abi import encode as abi_encode
+from eth_utils import function_abi_to_4byte_selector, get_abi_input_types
 from dotenv import load_dotenv
 
 load_dotenv()
 
 
+# Checksumming hashes the address with keccak; the same few addresses recur
+_to_checksum = functools.lru_cache(maxsize=4096)(Web3.to_checksum_address)
+
+
+def _abi_json(contract_abi: List[Dict[str, Any]]) -> str:
+    """Canonical JSON text of an ABI, so caches are keyed by its content rather than its id()"""
+    return json.dumps(contract_abi, sort_keys=True, separators=(',', ':'))
+
+
+@functools.lru_cache(maxsize=256)
+def _encoder(abi_json: str, function_name: str, arity: int) -> Optional[tuple]:
+    """(selector, input types) of the only overload of function_name taking arity arguments, else None"""
+    matches = [item for item in json.loads(abi_json)
+               if item.get('type') == 'function' and item.get('name') == function_name
+               and len(item.get('inputs', [])) == arity]
+    if len(matches) != 1:
+        # Missing, or overloads with the same arity that only web3's type matching can tell apart
+        return None
+    return function_abi_to_4byte_selector(matches[0]), get_abi_input_types(matches[0])
+
+
+def _encode_call(contract_abi: List[Dict[str, Any]], function_name: str, function_args: tuple) -> Optional[bytes]:
+    """
+    Encode calldata from a cached selector and input types.
+    
+    Returns None when the ABI has no single matching function or the arguments
+    need web3's own normalization; callers then fall back to contract.functions.
+    """
+    encoder = _encoder(_abi_json(contract_abi), function_name, len(function_args))
+    if encoder is None:
+        return None
+    try:
+        return encoder[0] + abi_encode(encoder[1], function_args)
+    except Exception:
+        return None
+
+
+def wait_for_receipt_ws(web3: Web3, ws_url: str, tx_hash, timeout: float = 120):
+    """
+    Wait for a receipt, checking once per new block (newHeads subscription)
+    rather than polling eth_getTransactionReceipt every 100ms.
+    
+    Args:
+        web3: Web3 instance used for the receipt lookups
+        ws_url: WebSocket RPC endpoint to subscribe on
+        tx_hash: Transaction hash
+        timeout: Seconds to wait before raising TimeExhausted
+    """
+    from websockets.sync.client import connect
+    
+    deadline = time.monotonic() + timeout
+    with connect(ws_url) as ws:
+        ws.send(json.dumps({"jsonrpc": "2.0", "id": 1, "method": "eth_subscribe", "params": ["newHeads"]}))
+        ws.recv(timeout=timeout)  # subscription id
+        # Check before the first head too, in case the tx was mined while subscribing
+        while True:
+            try:
+                return web3.eth.get_transaction_receipt(tx_hash)
+            except TransactionNotFound:
+                pass
+            remaining = deadline - time.monotonic()
+            try:
+                if remaining <= 0:
+                    raise TimeoutError
+                ws.recv(timeout=remaining)
+            except TimeoutError:
+                raise TimeExhausted(f"Transaction {Web3.to_hex(tx_hash)} not mined after {timeout} seconds")
+
+
+def wait_for_receipt(web3: Web3, tx_hash, timeout: float = 120):
+    """Wait for a receipt via newHeads when ARC_WSS_URL is set, else by polling."""
+    ws_url = os.getenv('ARC_WSS_URL')
+    if ws_url:
+        return wait_for_receipt_ws(web3, ws_url, tx_hash, timeout)
+    return web3.eth.wait_for_transaction_receipt(tx_hash, timeout=timeout)
+
+
+# Cleared the first time the node reports eth_sendRawTransactionSync as unsupported
+_sync_send_supported = True
+
+# Error codes for "method not found" / "invalid request"; anything else (e.g. geth's generic
+# -32000 for nonce too low or already known) is a real error for this transaction
+_SYNC_UNSUPPORTED_CODES = {-32601, -32600}
+_SYNC_UNSUPPORTED_MESSAGES = ("not supported", "does not exist", "method not found")
+
+
+def send_raw_transaction_sync(web3: Web3, raw_tx: bytes, timeout: int = 120) -> tuple:
+    """
+    Submit a signed transaction and get its receipt in one RPC (eth_sendRawTransactionSync).
+    
+    Falls back to send_raw_transaction + wait_for_receipt on nodes that don't
+    implement the method.
+    
+    Returns:
+        (tx_hash, receipt); the receipt has the same shape (logs included) as
+        wait_for_transaction_receipt's
+    """
+    global _sync_send_supported
+    if _sync_send_supported:
+        response = web3.provider.make_request("eth_sendRawTransactionSync", [Web3.to_hex(raw_tx)])
+        error = response.get('error')
+        if not error:
+            receipt = AttributeDict.recursive(receipt_formatter(response['result']))
+            return receipt.transactionHash, receipt
+        if error.get('code') == 4 and error.get('data'):
+            # Submitted but not mined within the node's timeout: keep polling for it
+            tx_hash = HexBytes(error['data'])
+            return tx_hash, wait_for_receipt(web3, tx_hash, timeout)
+        message = str(error.get('message', '')).lower()
+        if (error.get('code') not in _SYNC_UNSUPPORTED_CODES
+                and not any(m in message for m in _SYNC_UNSUPPORTED_MESSAGES)):
+            # Resending the same signed tx would only turn this into "already known"
+            raise ValueError(error.get('message', error))
+        _sync_send_supported = False
+    
+    tx_hash = web3.eth.send_raw_transaction(raw_tx)
+    return tx_hash, wait_for_receipt(web3, tx_hash, timeout)
+
+
+def _fetch_tx_params(web3: Web3, address: str) -> tuple:
+    """Fetch nonce and gas price concurrently (one RPC round-trip of wall time)."""
+    with ThreadPoolExecutor(max_workers=2) as pool:
+        nonce = pool.submit(web3.eth.get_transaction_count, address)
+        gas_price = pool.submit(lambda: web3.eth.gas_price)
+        return nonce.result(), gas_price.result()
+
+
+class ReceiptWatcher:
+    """Confirms submitted transactions on a background thread (for wait_receipt=False)."""
+    
+    def __init__(self, web3: Web3, label: str, poll_interval: float = 2.0, timeout: float = 120):
+        """
+        Initialize Receipt Watcher.
+        
+        Args:
+            web3: Web3 instance used to poll receipts
+            label: Log prefix, e.g. "Paymaster"
+            poll_interval: Seconds between receipt polls
+            timeout: Seconds before an unconfirmed transaction is given up on
+        """
+        self.web3 = web3
+        self.label = label
+        self.poll_interval = poll_interval
+        self.timeout = timeout
+        self.results: Dict[str, Dict[str, Any]] = {}  # tx hash (hex) -> final result
+        self._queue: "queue.Queue" = queue.Queue()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+    
+    def watch(self, tx_hash) -> None:
+        """Queue a transaction hash for confirmation."""
+        self._queue.put((tx_hash, time.time()))
+    
+    def get_result(self, tx_hash: str) -> Optional[Dict[str, Any]]:
+        """Return the final result for a hash, or None while it is still pending."""
+        return self.results.get(tx_hash)
+    
+    def _run(self) -> None:
+        pending = {}
+        while True:
+            # Block only when there is nothing left to poll
+            try:
+                while True:
+                    tx_hash, submitted = self._queue.get(block=not pending)
+                    pending[tx_hash] = submitted
+            except queue.Empty:
+                pass
+            
+            for tx_hash, submitted in list(pending.items()):
+                try:
+                    receipt = self.web3.eth.get_transaction_receipt(tx_hash)
+                except TransactionNotFound:
+                    if time.time() - submitted > self.timeout:
+                        print(f"[{self.label}] ❌ No receipt for {tx_hash.hex()} after {self.timeout}s")
+                        self.results[tx_hash.hex()] = {
+                            'success': False, 'tx_hash': tx_hash.hex(), 'error': 'Receipt timeout'
+                        }
+                        del pending[tx_hash]
+                    continue
+                except Exception as e:
+                    print(f"[{self.label}] Receipt poll error: {e}")
+                    continue
+                
+                del pending[tx_hash]
+                if receipt.status == 1:
+                    print(f"[{self.label}] ✅ Confirmed {tx_hash.hex()} (gas used: {receipt.gasUsed})")
+                    self.results[tx_hash.hex()] = {
+                        'success': True,
+                        'tx_hash': tx_hash.hex(),
+                        'gas_used': receipt.gasUsed,
+                        'block_number': receipt.blockNumber
+                    }
+                else:
+                    print(f"[{self.label}] ❌ Transaction {tx_hash.hex()} reverted")
+                    self.results[tx_hash.hex()] = {
+                        'success': False, 'tx_hash': tx_hash.hex(), 'error': 'Transaction reverted'
+                    }
+            
+            if pending:
+                time.sleep(self.poll_interval)
+
+
 class PaymasterManager:
     """Manages paymaster interactions for gasless oracle transactions."""
     
@@ -27,11 +240,19 @@ class PaymasterManager:
             paymaster_abi: Paymaster contract ABI
         """
         self.web3 = web3
-        self.paymaster_address = Web3.to_checksum_address(paymaster_address)
+        self.paymaster_address = _to_checksum(paymaster_address)
         self.paymaster = web3.eth.contract(
             address=self.paymaster_address,
             abi=paymaster_abi
         )
+        # Per-instance invariants, resolved once instead of on every sponsorship
+        self.chain_id = web3.eth.chain_id
+        oracle_key = os.getenv('ORACLE_PRIVATE_KEY')
+        self.oracle_account = Account.from_key(oracle_key) if oracle_key else None
+        # (checksum address, ABI JSON) -> contract object, for the most recently used targets
+        self._target_cache = functools.lru_cache(maxsize=64)(self._build_target)
+        # Started on the first wait_receipt=False call
+        self.receipt_watcher: Optional[ReceiptWatcher] = None
     
     def sponsor_transaction(
         self,
@@ -40,7 +261,8 @@ class PaymasterManager:
         function_name: str,
         function_args: tuple,
         contract_abi: Dict[str, Any],
-        gas_limit: int = 200000
+        gas_limit: int = 200000,
+        wait_receipt: bool = True
     ) -> Dict[str, Any]:
         """
         Sponsor a transaction through paymaster.
@@ -52,73 +274,32 @@ class PaymasterManager:
             function_args: Function arguments
             contract_abi: Target contract ABI
             gas_limit: Gas limit for transaction
+            wait_receipt: If False, return right after submission with 'pending': True;
+                the receipt is confirmed in the background (see receipt_watcher)
             
         Returns:
             Dictionary with transaction result
         """
         try:
-            # Build target contract call
-            target = self.web3.eth.contract(
-                address=Web3.to_checksum_address(target_contract),
-                abi=contract_abi
-            )
-            
-            # Encode function call
-            function_call = getattr(target.functions, function_name)(*function_args)
-            data = function_call._encode_transaction_data()
-            
-            # Call paymaster sponsorTransaction
+            oracle_account = self._oracle_account()
             print(f"[Paymaster] Sponsoring transaction for oracle {oracle_address}...")
             print(f"[Paymaster] Target: {target_contract}, Function: {function_name}")
             
-            # Get oracle account (for signing if needed)
-            oracle_key = os.getenv('ORACLE_PRIVATE_KEY')
-            if not oracle_key:
-                raise ValueError("ORACLE_PRIVATE_KEY not set")
-            
-            oracle_account = Account.from_key(oracle_key)
-            
-            # Build paymaster transaction
-            nonce = self.web3.eth.get_transaction_count(oracle_account.address)
-            gas_price = self.web3.eth.gas_price
-            
-            tx = self.paymaster.functions.sponsorTransaction(
-                Web3.to_checksum_address(target_contract),
-                data,
-                gas_limit
-            ).build_transaction({
-                'from': oracle_account.address,
-                'nonce': nonce,
-                'gas': 300000,  # Gas for paymaster call
-                'gasPrice': gas_price,
-                'chainId': self.web3.eth.chain_id
-            })
-            
-            # Sign and send
-            signed_tx = oracle_account.sign_transaction(tx)
-            tx_hash = self.web3.eth.send_raw_transaction(signed_tx.rawTransaction)
-            
-            print(f"[Paymaster] Transaction submitted: {tx_hash.hex()}")
-            
-            # Wait for confirmation
-            receipt = self.web3.eth.wait_for_transaction_receipt(tx_hash, timeout=120)
-            
-            if receipt.status == 1:
-                print(f"[Paymaster] ✅ Transaction sponsored successfully!")
-                print(f"[Paymaster] Gas used: {receipt.gasUsed}")
-                return {
-                    'success': True,
-                    'tx_hash': tx_hash.hex(),
-                    'gas_used': receipt.gasUsed,
-                    'block_number': receipt.blockNumber
-                }
-            else:
-                print(f"[Paymaster] ❌ Transaction failed")
-                return {
-                    'success': False,
-                    'tx_hash': tx_hash.hex(),
-                    'error': 'Transaction reverted'
-                }
+            nonce, gas_price = _fetch_tx_params(self.web3, oracle_account.address)
+            if wait_receipt:
+                # Submission and receipt in a single round-trip where the node supports it
+                return self._wait_for_result(*self._send_sponsored(
+                    oracle_account, target_contract, function_name, function_args,
+                    contract_abi, gas_limit, nonce, gas_price, sync=True
+                ))
+            tx_hash, _ = self._send_sponsored(
+                oracle_account, target_contract, function_name, function_args,
+                contract_abi, gas_limit, nonce, gas_price
+            )
+            if self.receipt_watcher is None:
+                self.receipt_watcher = ReceiptWatcher(self.web3, "Paymaster")
+            self.receipt_watcher.watch(tx_hash)
+            return {'success': True, 'tx_hash': tx_hash.hex(), 'pending': True}
                 
         except Exception as e:
             print(f"[Paymaster] ERROR: {str(e)}")
@@ -127,6 +308,130 @@ class PaymasterManager:
                 'error': str(e)
             }
     
+    def sponsor_transactions_batch(self, items: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        Sponsor several transactions, waiting for their receipts concurrently.
+        
+        Args:
+            items: List of dicts with target_contract, function_name, function_args,
+                contract_abi and optional gas_limit (see sponsor_transaction)
+            
+        Returns:
+            List of transaction results, in the same order as items
+        """
+        results: List[Optional[Dict[str, Any]]] = [None] * len(items)
+        pending = []
+        try:
+            oracle_account = self._oracle_account()
+            nonce, gas_price = _fetch_tx_params(self.web3, oracle_account.address)
+        except Exception as e:
+            print(f"[Paymaster] ERROR: {str(e)}")
+            return [{'success': False, 'error': str(e)} for _ in items]
+        
+        print(f"[Paymaster] Sponsoring {len(items)} transactions...")
+        # Sends are sequential so each transaction gets the next nonce
+        for i, item in enumerate(items):
+            try:
+                tx_hash, _ = self._send_sponsored(
+                    oracle_account, item['target_contract'], item['function_name'],
+                    item['function_args'], item['contract_abi'], item.get('gas_limit', 200000),
+                    nonce, gas_price
+                )
+                nonce += 1
+                pending.append((i, tx_hash))
+            except Exception as e:
+                print(f"[Paymaster] ERROR: {str(e)}")
+                results[i] = {'success': False, 'error': str(e)}
+        
+        if pending:
+            with ThreadPoolExecutor(max_workers=len(pending)) as pool:
+                receipts = pool.map(lambda p: self._wait_for_result(p[1]), pending)
+                for (i, _), result in zip(pending, receipts):
+                    results[i] = result
+        return results
+    
+    def _oracle_account(self):
+        """Return the oracle signing account loaded from ORACLE_PRIVATE_KEY."""
+        if self.oracle_account is None:
+            raise ValueError("ORACLE_PRIVATE_KEY not set")
+        return self.oracle_account
+    
+    def _build_target(self, address: str, abi_json: str):
+        return self.web3.eth.contract(address=address, abi=json.loads(abi_json))
+    
+    def _target_contract(self, target_contract: str, contract_abi: Dict[str, Any]):
+        """Return a (cached) contract object for the target address and ABI."""
+        return self._target_cache(_to_checksum(target_contract), _abi_json(contract_abi))
+    
+    def _send_sponsored(self, oracle_account, target_contract: str, function_name: str,
+                        function_args: tuple, contract_abi: Dict[str, Any], gas_limit: int,
+                        nonce: int, gas_price: int, sync: bool = False):
+        """
+        Build, sign and send one sponsorTransaction call.
+        
+        Returns:
+            (tx_hash, receipt); receipt is None unless sync is True
+        """
+        # Encode function call
+        data = _encode_call(contract_abi, function_name, function_args)
+        if data is None:
+            target = self._target_contract(target_contract, contract_abi)
+            function_call = getattr(target.functions, function_name)(*function_args)
+            data = function_call._encode_transaction_data()
+        
+        # Build paymaster transaction
+        tx = self.paymaster.functions.sponsorTransaction(
+            _to_checksum(target_contract),
+            data,
+            gas_limit
+        ).build_transaction({
+            'from': oracle_account.address,
+            'nonce': nonce,
+            'gas': 300000,  # Gas for paymaster call
+            'gasPrice': gas_price,
+            'chainId': self.chain_id
+        })
+        
+        # Sign and send
+        signed_tx = oracle_account.sign_transaction(tx)
+        if sync:
+            tx_hash, receipt = send_raw_transaction_sync(self.web3, signed_tx.rawTransaction)
+        else:
+            tx_hash, receipt = self.web3.eth.send_raw_transaction(signed_tx.rawTransaction), None
+        
+        print(f"[Paymaster] Transaction submitted: {tx_hash.hex()}")
+        return tx_hash, receipt
+    
+    def _wait_for_result(self, tx_hash, receipt=None) -> Dict[str, Any]:
+        """Wait for a sponsored transaction's receipt (unless already known) and summarize it."""
+        try:
+            if receipt is None:
+                receipt = wait_for_receipt(self.web3, tx_hash, timeout=120)
+        except Exception as e:
+            print(f"[Paymaster] ERROR: {str(e)}")
+            return {
+                'success': False,
+                'tx_hash': tx_hash.hex(),
+                'error': str(e)
+            }
+        
+        if receipt.status == 1:
+            print(f"[Paymaster] ✅ Transaction sponsored successfully!")
+            print(f"[Paymaster] Gas used: {receipt.gasUsed}")
+            return {
+                'success': True,
+                'tx_hash': tx_hash.hex(),
+                'gas_used': receipt.gasUsed,
+                'block_number': receipt.blockNumber
+            }
+        else:
+            print(f"[Paymaster] ❌ Transaction failed")
+            return {
+                'success': False,
+                'tx_hash': tx_hash.hex(),
+                'error': 'Transaction reverted'
+            }
+    
     def check_balance(self) -> int:
         """Check paymaster total balance."""
         try:
@@ -140,7 +445,7 @@ class PaymasterManager:
         """Check if oracle is authorized."""
         try:
             return self.paymaster.functions.isOracleAuthorized(
-                Web3.to_checksum_address(oracle_address)
+                _to_checksum(oracle_address)
             ).call()
         except Exception as e:
             print(f"[Paymaster] Error checking authorization: {e}")
@@ -174,12 +479,15 @@ class RelayPaymasterManager:
             relayer_key: Relayer private key
         """
         self.web3 = web3
-        self.paymaster_address = Web3.to_checksum_address(paymaster_address)
+        self.paymaster_address = _to_checksum(paymaster_address)
         self.paymaster = web3.eth.contract(
             address=self.paymaster_address,
             abi=paymaster_abi
         )
         self.relayer_account = Account.from_key(relayer_key)
+        self.chain_id = web3.eth.chain_id
+        # Started on the first wait_receipt=False call
+        self.receipt_watcher: Optional[ReceiptWatcher] = None
     
     def relay_transaction(
         self,
@@ -188,7 +496,8 @@ class RelayPaymasterManager:
         function_name: str,
         function_args: tuple,
         contract_abi: Dict[str, Any],
-        gas_limit: int = 200000
+        gas_limit: int = 200000,
+        wait_receipt: bool = True
     ) -> Dict[str, Any]:
         """
         Relay a transaction on behalf of oracle.
@@ -200,30 +509,31 @@ class RelayPaymasterManager:
             function_args: Function arguments
             contract_abi: Target contract ABI
             gas_limit: Gas limit
+            wait_receipt: If False, return right after submission with 'pending': True;
+                the receipt is confirmed in the background (see receipt_watcher)
             
         Returns:
             Dictionary with transaction result
         """
         try:
-            # Build target contract call
-            target = self.web3.eth.contract(
-                address=Web3.to_checksum_address(target_contract),
-                abi=contract_abi
-            )
-            
             # Encode function call
-            function_call = getattr(target.functions, function_name)(*function_args)
-            data = function_call._encode_transaction_data()
+            data = _encode_call(contract_abi, function_name, function_args)
+            if data is None:
+                target = self.web3.eth.contract(
+                    address=_to_checksum(target_contract),
+                    abi=contract_abi
+                )
+                function_call = getattr(target.functions, function_name)(*function_args)
+                data = function_call._encode_transaction_data()
             
             print(f"[RelayPaymaster] Relaying transaction for oracle {oracle_address}...")
             
             # Build relay transaction
-            nonce = self.web3.eth.get_transaction_count(self.relayer_account.address)
-            gas_price = self.web3.eth.gas_price
+            nonce, gas_price = _fetch_tx_params(self.web3, self.relayer_account.address)
             
             tx = self.paymaster.functions.relayTransaction(
-                Web3.to_checksum_address(oracle_address),
-                Web3.to_checksum_address(target_contract),
+                _to_checksum(oracle_address),
+                _to_checksum(target_contract),
                 data,
                 gas_limit
             ).build_transaction({
@@ -231,17 +541,23 @@ class RelayPaymasterManager:
                 'nonce': nonce,
                 'gas': 400000,  # Gas for relay call
                 'gasPrice': gas_price,
-                'chainId': self.web3.eth.chain_id
+                'chainId': self.chain_id
             })
             
             # Sign and send
             signed_tx = self.relayer_account.sign_transaction(tx)
-            tx_hash = self.web3.eth.send_raw_transaction(signed_tx.rawTransaction)
             
-            print(f"[RelayPaymaster] Transaction submitted: {tx_hash.hex()}")
+            if not wait_receipt:
+                tx_hash = self.web3.eth.send_raw_transaction(signed_tx.rawTransaction)
+                print(f"[RelayPaymaster] Transaction submitted: {tx_hash.hex()}")
+                if self.receipt_watcher is None:
+                    self.receipt_watcher = ReceiptWatcher(self.web3, "RelayPaymaster")
+                self.receipt_watcher.watch(tx_hash)
+                return {'success': True, 'tx_hash': tx_hash.hex(), 'pending': True}
             
-            # Wait for confirmation
-            receipt = self.web3.eth.wait_for_transaction_receipt(tx_hash, timeout=120)
+            # Submit and wait for confirmation in a single round-trip where supported
+            tx_hash, receipt = send_raw_transaction_sync(self.web3, signed_tx.rawTransaction)
+            print(f"[RelayPaymaster] Transaction submitted: {tx_hash.hex()}")
             
             if receipt.status == 1:
                 print(f"[RelayPaymaster] ✅ Transaction relayed successfully!")
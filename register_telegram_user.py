@@ -6,26 +6,54 @@ Use this to register users without setting up webhooks
 
 import json
 import os
+import sqlite3
 
+try:
+    import orjson
+except ImportError:  # optional speedup; stdlib json is the fallback
+    orjson = None
+
+TELEGRAM_USERS_DB = 'telegram_users.db'
+# Legacy JSON store, imported into the database the first time it is opened
 TELEGRAM_USERS_FILE = 'telegram_users.json'
 
+def connect():
+    """Open the users database, creating (and migrating) it if needed"""
+    conn = sqlite3.connect(TELEGRAM_USERS_DB)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.execute("CREATE TABLE IF NOT EXISTS users(username TEXT PRIMARY KEY, chat_id TEXT)")
+    
+    empty = conn.execute("SELECT 1 FROM users LIMIT 1").fetchone() is None
+    if empty and os.path.exists(TELEGRAM_USERS_FILE):
+        with open(TELEGRAM_USERS_FILE, 'rb') as f:
+            data = f.read()
+        legacy = orjson.loads(data) if orjson else json.loads(data)
+        with conn:
+            conn.executemany("INSERT OR REPLACE INTO users VALUES (?, ?)", legacy.items())
+        print(f"✅ Imported {len(legacy)} users from {TELEGRAM_USERS_FILE}")
+    return conn
+
 def load_users():
     """Load existing users"""
-    if os.path.exists(TELEGRAM_USERS_FILE):
-        with open(TELEGRAM_USERS_FILE, 'r') as f:
-            return json.load(f)
-    return {}
+    conn = connect()
+    try:
+        return dict(conn.execute("SELECT username, chat_id FROM users"))
+    finally:
+        conn.close()
 
-def save_users(users):
-    """Save users to file"""
-    with open(TELEGRAM_USERS_FILE, 'w') as f:
-        json.dump(users, f, indent=2)
-    print(f"✅ Saved {len(users)} users to {TELEGRAM_USERS_FILE}")
+def save_user(username, chat_id):
+    """Insert or update a single user"""
+    conn = connect()
+    try:
+        with conn:
+            conn.execute("INSERT OR REPLACE INTO users VALUES (?, ?)", (username, str(chat_id)))
+    finally:
+        conn.close()
+    print(f"✅ Saved @{username} to {TELEGRAM_USERS_DB}")
 
 def register_user():
     """Register a new user"""
-    users = load_users()
-    
     print("=" * 60)
     print("TELEGRAM USER REGISTRATION")
     print("=" * 60)
@@ -48,8 +76,7 @@ def register_user():
         print("❌ Chat ID must be numeric")
         return
     
-    users[username] = chat_id
-    save_users(users)
+    save_user(username, chat_id)
     
     print()
     print("✅ User registered successfully!")
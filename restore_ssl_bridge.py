@@ -1,66 +1,13 @@
-
-# Valid Google Trust Services Global Root CA PEM
-# Source: https://pki.goog/roots.pem
-CA_BUNDLE = """
------BEGIN CERTIFICATE-----
-MIIDujCCAqKgAwIBAgILBAAAAAABD4Ym5g0wDQYJKoZIhvcNAQEFBQAwMzELMAkG
-A1UEBhMCVVMxCzAJBgNVBAoTAkdlMTEjMCEGA1UEAxMaR2xvYmFsU2lnbiBSb290
-IENBIC0gUjIwMB4XDTA2MTIxNTA4MDAwMFoXDTIxMTIxNTA4MDAwMFowMzELMAkG
-A1UEBhMCVVMxCzAJBgNVBAoTAkdlMTEjMCEGA1UEAxMaR2xvYmFsU2lnbiBSb290
-IENBIC0gUjIwggEiMA0GCSqGSIb3DQEBAQUAA4IBDwAwggEKAoIBAQDaDuaZjc6r
-3rMqYVjQ3dbISRTKF3z8KHZaetwI0sjDUo1918hC4rYiQqLtVJoVLUITB7g6PFgH
-y142e0sS0q9rF6a+jK9dZ6b0o7qF+e438V7q5q5T5e5b3K1h5p5mJ7r5W3d5d5d5
-d5d5d5d5d5d5d5d5d5d5d5d5d5d5d5d5d5d5d5d5d5d5d5d5d5d5d5d5d5d5d5d5
------END CERTIFICATE-----
------BEGIN CERTIFICATE-----
-MIIEXDCCA0SgAwIBAgINAeOpMBz8cgY4P5pTHTANBgkqhkiG9w0BAQsFADBMMSAw
-HgYDVQQLExdHbG9iYWxTaWduIFJvb3QgQ0EgLSBSMjETMBEGA1UEChMKR2xvYmFs
-U2lnbjETMBEGA1UEAxMKR2xvYmFsU2lnbjAeFw0wNjEyMTUwODAwMDBaFw0yMTEy
-MTUwODAwMDBaMEwxIDAeBgNVBAsTF0dsb2JhbFNpZ24gUm9vdCBDQSAtIFIyMRMw
-EQYDVQQKEwpHbG9iYWxTaWduMRMwEQYDVQQDEwpHbG9iYWxTaWduMIIBIjANBgkq
-hkiG9w0BAQEFAAOCAQ8AMIIBCgKCAQEA6K7M2IGj5xI9+rU6F6u6D6g5N5R+2H5I
-3K6g6L0e5x5R5x5R5x5R5x5R5x5R5x5R5x5R5x5R5x5R5x5R5x5R5x5R5x5R5x5R
------END CERTIFICATE-----
------BEGIN CERTIFICATE-----
-MIIESjCCAzKgAwIBAgINAeO0mqGNIqwxAJYmrzANBgkqhkiG9w0BAQsFADBMMSAw
-HgYDVQQLExdHbG9iYWxTaWduIFJvb3QgQ0EgLSBSMjETMBEGA1UEChMKR2xvYmFs
-U2lnbjETMBEGA1UEAxMKR2xvYmFsU2lnbjAeFw0wNjEyMTUwODAwMDBaFw0yMTEy
-MTUwODAwMDBaMEwxIDAeBgNVBAsTF0dsb2JhbFNpZ24gUm9vdCBDQSAtIFIyMRMw
-EQYDVQQKEwpHbG9iYWxTaWduMRMwEQYDVQQDEwpHbG9iYWxTaWduMIIBIjANBgkq
-hkiG9w0BAQEFAAOCAQ8AMIIBCgKCAQEA6K7M2IGj5xI9+rU6F6u6D6g5N5R+2H5I
------END CERTIFICATE-----
-"""
-# Note: The above are placeholders. I will write a script to fetch or use a known GTS Root R1/R2/R3/R4 real content.
-# Since I cannot fetch, I will rely on standard Python `ssl` module to inspect default verify paths or try to copy 
-# the system certs if available at /etc/ssl/cert.pem (Mac).
+# Writes a CA bundle to /tmp/cacert.pem for tools that point
+# REQUESTS_CA_BUNDLE / GRPC_DEFAULT_SSL_ROOTS_FILE_PATH at it (see test_api_access.py).
+# certifi (installed with requests) ships a maintained Mozilla bundle, so there is
+# no need to probe system cert locations.
 
 import shutil
-import os
-
-target = "/tmp/cacert.pem"
 
-# Try to copy system certs which might be readable even if venv ones aren't
-possible_system_certs = [
-    "/etc/ssl/cert.pem",
-    "/etc/ssl/certs/ca-certificates.crt",
-    "/etc/pki/tls/certs/ca-bundle.crt",
-    "/usr/local/etc/openssl@1.1/cert.pem",
-    "/usr/local/etc/openssl@3/cert.pem"
-]
+import certifi
 
-found = False
-for p in possible_system_certs:
-    if os.path.exists(p):
-        print(f"Found system certs at {p}")
-        try:
-            shutil.copy(p, target)
-            print("Copied to /tmp/cacert.pem")
-            found = True
-            break
-        except Exception as e:
-            print(f"Failed to copy {p}: {e}")
+target = "/tmp/cacert.pem"
 
-if not found:
-    print("Could not find system certs. Writing fallback minimal Google Roots...")
-    # I'll create a minimal file. 
-    # For now, let's hope system certs work.
+shutil.copy(certifi.where(), target)
+print(f"Copied {certifi.where()} to {target}")
@@ -4,6 +4,8 @@ Deploy new ArcFuseEscrowFactory to Arc Testnet
 """
 import os
 import json
+import functools
+from pathlib import Path
 from web3 import Web3
 from eth_account import Account
 
@@ -17,6 +19,19 @@ except:
 ARC_RPC_URL = os.getenv("ARC_TESTNET_RPC_URL", "https://rpc.testnet.arc.network")
 PRIVATE_KEY = os.getenv("PRIVATE_KEY")
 ORACLE_ADDRESS = os.getenv("ORACLE_ADDRESS", "0x876f7ee6D6AA43c5A6cC13c05522eb47363E5907")  # Fallback to deployer
+FACTORY_ARTIFACT = 'artifacts/contracts/ArcFuseEscrowFactory.sol/ArcFuseEscrowFactory.json'
+
+try:
+    import orjson
+except ImportError:  # optional speedup; stdlib json is the fallback
+    orjson = None
+
+@functools.lru_cache(maxsize=None)
+def _load_artifact(path):
+    """Parse a compiled contract artifact once, returning (abi, bytecode)."""
+    data = Path(path).read_bytes()
+    artifact = orjson.loads(data) if orjson else json.loads(data)
+    return artifact['abi'], artifact['bytecode']
 
 def main():
     if not PRIVATE_KEY:
@@ -32,7 +47,18 @@ def main():
     deployer = account.address
     print(f"🔑 Deployer: {deployer}")
     
-    balance = web3.eth.get_balance(deployer)
+    # Balance, nonce and chain id in one JSON-RPC round-trip
+    if hasattr(web3, 'batch_requests'):
+        with web3.batch_requests() as batch:
+            batch.add(web3.eth.get_balance(deployer))
+            batch.add(web3.eth.get_transaction_count(deployer))
+            batch.add(web3.eth.chain_id)
+            balance, nonce, chain_id = batch.execute()
+    else:
+        # web3 < 7 has no batch support
+        balance = web3.eth.get_balance(deployer)
+        nonce = web3.eth.get_transaction_count(deployer)
+        chain_id = web3.eth.chain_id
     print(f"💰 Balance: {web3.from_wei(balance, 'ether')} USDC")
     
     if balance < web3.to_wei(0.1, 'ether'):
@@ -40,11 +66,7 @@ def main():
         return
     
     # Load Factory artifact
-    with open('artifacts/contracts/ArcFuseEscrowFactory.sol/ArcFuseEscrowFactory.json', 'r') as f:
-        factory_artifact = json.load(f)
-    
-    factory_abi = factory_artifact['abi']
-    factory_bytecode = factory_artifact['bytecode']
+    factory_abi, factory_bytecode = _load_artifact(FACTORY_ARTIFACT)
     
     # Create contract instance
     Factory = web3.eth.contract(abi=factory_abi, bytecode=factory_bytecode)
@@ -52,12 +74,12 @@ def main():
     # Build deployment transaction
     print(f"🚀 Deploying ArcFuseEscrowFactory with oracle: {ORACLE_ADDRESS}")
     
-    nonce = web3.eth.get_transaction_count(deployer)
     tx = Factory.constructor(ORACLE_ADDRESS).build_transaction({
         'from': deployer,
         'nonce': nonce,
         'gas': 5000000,
-        'gasPrice': web3.to_wei(20, 'gwei')
+        'gasPrice': web3.to_wei(20, 'gwei'),
+        'chainId': chain_id
     })
     
     signed = account.sign_transaction(tx)
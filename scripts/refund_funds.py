@@ -4,13 +4,26 @@ Refund funds from escrow (Oracle only)
 """
 import os
 import sys
+import functools
+from pathlib import Path
 from web3 import Web3
 from eth_account import Account
 from dotenv import load_dotenv
 import json
 
+try:
+    import orjson
+except ImportError:  # optional speedup; stdlib json is the fallback
+    orjson = None
+
 load_dotenv()
 
+@functools.lru_cache(maxsize=None)
+def _load_abi(path):
+    """Parse a contract ABI file once per process (treat the result as read-only)."""
+    data = Path(path).read_bytes()
+    return orjson.loads(data) if orjson else json.loads(data)
+
 def refund_funds(seller_address, reason):
     """Refund funds to buyers after failed verification."""
     
@@ -31,8 +44,7 @@ def refund_funds(seller_address, reason):
         print("ERROR: ESCROW_CONTRACT_ADDRESS not set in .env")
         sys.exit(1)
     
-    with open('escrow_abi.json', 'r') as f:
-        abi = json.load(f)
+    abi = _load_abi('escrow_abi.json')
     
     contract = w3.eth.contract(address=Web3.to_checksum_address(contract_address), abi=abi)
     
@@ -44,8 +56,27 @@ def refund_funds(seller_address, reason):
     
     oracle_account = Account.from_key(oracle_key)
     
+    # Checksum once; the seller address is reused for every call below
+    seller = Web3.to_checksum_address(seller_address)
+    
+    # Read oracle, balance, depositors and tx params in one JSON-RPC round-trip
+    if hasattr(w3, 'batch_requests'):
+        with w3.batch_requests() as batch:
+            batch.add(contract.functions.oracle())
+            batch.add(contract.functions.deposits(seller))
+            batch.add(contract.functions.getDepositors(seller))
+            batch.add(w3.eth.get_transaction_count(oracle_account.address))
+            batch.add(w3.eth.gas_price)
+            contract_oracle, balance, depositors, nonce, gas_price = batch.execute()
+    else:
+        # web3 < 7 has no batch support
+        contract_oracle = contract.functions.oracle().call()
+        balance = contract.functions.deposits(seller).call()
+        depositors = contract.functions.getDepositors(seller).call()
+        nonce = w3.eth.get_transaction_count(oracle_account.address)
+        gas_price = w3.eth.gas_price
+    
     # Verify oracle address matches contract
-    contract_oracle = contract.functions.oracle().call()
     if contract_oracle.lower() != oracle_account.address.lower():
         print(f"ERROR: Oracle address mismatch!")
         print(f"  Contract oracle: {contract_oracle}")
@@ -53,13 +84,11 @@ def refund_funds(seller_address, reason):
         sys.exit(1)
     
     # Check balance
-    balance = contract.functions.deposits(Web3.to_checksum_address(seller_address)).call()
     if balance == 0:
         print(f"ERROR: No funds in escrow for seller {seller_address}")
         sys.exit(1)
     
-    # Get depositors
-    depositors = contract.functions.getDepositors(Web3.to_checksum_address(seller_address)).call()
+    # Check depositors
     if len(depositors) == 0:
         print(f"ERROR: No depositors found for seller {seller_address}")
         sys.exit(1)
@@ -71,12 +100,9 @@ def refund_funds(seller_address, reason):
         print(f"  {i}. {dep[0]}: {Web3.from_wei(dep[1], 'ether')} ETH")
     
     # Build transaction
-    nonce = w3.eth.get_transaction_count(oracle_account.address)
-    gas_price = w3.eth.gas_price
-    
     try:
         tx = contract.functions.refund(
-            Web3.to_checksum_address(seller_address),
+            seller,
             reason
         ).build_transaction({
             'from': oracle_account.address,
@@ -4,13 +4,35 @@ Release funds from escrow (Oracle only)
 """
 import os
 import sys
+import functools
+from pathlib import Path
 from web3 import Web3
 from eth_account import Account
 from dotenv import load_dotenv
 import json
 
+try:
+    import orjson
+except ImportError:  # optional speedup; stdlib json is the fallback
+    orjson = None
+
+# Add parent directory to path to import paymaster_manager
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from paymaster_manager import send_raw_transaction_sync
+
 load_dotenv()
 
+@functools.lru_cache(maxsize=None)
+def _load_abi(path):
+    """Parse a contract ABI file once per process (treat the result as read-only)."""
+    data = Path(path).read_bytes()
+    return orjson.loads(data) if orjson else json.loads(data)
+
+@functools.lru_cache(maxsize=4)
+def _load_account(private_key):
+    """Derive the signing account once per key (the public key derivation is the costly part)."""
+    return Account.from_key(private_key)
+
 def release_funds(seller_address, transaction_id):
     """Release funds to seller after successful verification."""
     
@@ -31,8 +53,7 @@ def release_funds(seller_address, transaction_id):
         print("ERROR: ESCROW_CONTRACT_ADDRESS not set in .env")
         sys.exit(1)
     
-    with open('escrow_abi.json', 'r') as f:
-        abi = json.load(f)
+    abi = _load_abi('escrow_abi.json')
     
     contract = w3.eth.contract(address=Web3.to_checksum_address(contract_address), abi=abi)
     
@@ -42,10 +63,27 @@ def release_funds(seller_address, transaction_id):
         print("ERROR: ORACLE_PRIVATE_KEY not set in .env")
         sys.exit(1)
     
-    oracle_account = Account.from_key(oracle_key)
+    oracle_account = _load_account(oracle_key)
+    
+    # Checksum once; the seller address is reused for every call below
+    seller = Web3.to_checksum_address(seller_address)
+    
+    # Pre-flight reads in one JSON-RPC batch (one round-trip instead of four)
+    if hasattr(w3, 'batch_requests'):
+        with w3.batch_requests() as batch:
+            batch.add(contract.functions.oracle())
+            batch.add(contract.functions.deposits(seller))
+            batch.add(w3.eth.get_transaction_count(oracle_account.address))
+            batch.add(w3.eth.gas_price)
+            contract_oracle, balance, nonce, gas_price = batch.execute()
+    else:
+        # web3 < 7 has no batch support
+        contract_oracle = contract.functions.oracle().call()
+        balance = contract.functions.deposits(seller).call()
+        nonce = w3.eth.get_transaction_count(oracle_account.address)
+        gas_price = w3.eth.gas_price
     
     # Verify oracle address matches contract
-    contract_oracle = contract.functions.oracle().call()
     if contract_oracle.lower() != oracle_account.address.lower():
         print(f"ERROR: Oracle address mismatch!")
         print(f"  Contract oracle: {contract_oracle}")
@@ -53,7 +91,6 @@ def release_funds(seller_address, transaction_id):
         sys.exit(1)
     
     # Check balance
-    balance = contract.functions.deposits(Web3.to_checksum_address(seller_address)).call()
     if balance == 0:
         print(f"ERROR: No funds in escrow for seller {seller_address}")
         sys.exit(1)
@@ -62,12 +99,9 @@ def release_funds(seller_address, transaction_id):
     print(f"Transaction ID: {transaction_id}")
     
     # Build transaction
-    nonce = w3.eth.get_transaction_count(oracle_account.address)
-    gas_price = w3.eth.gas_price
-    
     try:
         tx = contract.functions.release(
-            Web3.to_checksum_address(seller_address),
+            seller,
             transaction_id
         ).build_transaction({
             'from': oracle_account.address,
@@ -77,15 +111,13 @@ def release_funds(seller_address, transaction_id):
             'chainId': 11155111  # Update with actual Arc testnet chain ID
         })
         
-        # Sign and send
+        # Sign, send and wait for confirmation (one round-trip where supported)
         signed_tx = oracle_account.sign_transaction(tx)
-        tx_hash = w3.eth.send_raw_transaction(signed_tx.rawTransaction)
-        
-        print(f"\n📤 Transaction submitted: {tx_hash.hex()}")
-        print(f"View on explorer: https://testnet.arcscan.app/tx/{tx_hash.hex()}")
+        # The hash is known from the signed bytes, so report it before blocking on confirmation
+        print(f"\n📤 Transaction submitted: {signed_tx.hash.hex()}")
+        print(f"View on explorer: https://testnet.arcscan.app/tx/{signed_tx.hash.hex()}")
         
-        # Wait for confirmation
-        receipt = w3.eth.wait_for_transaction_receipt(tx_hash, timeout=120)
+        tx_hash, receipt = send_raw_transaction_sync(w3, signed_tx.rawTransaction)
         
         if receipt.status == 1:
             print(f"\n✅ Release confirmed in block {receipt.blockNumber}")
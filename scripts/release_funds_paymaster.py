@@ -4,17 +4,30 @@ Release funds using paymaster (Oracle doesn't need native currency)
 """
 import os
 import sys
+import functools
+from pathlib import Path
 from web3 import Web3
 from eth_account import Account
 from dotenv import load_dotenv
 import json
 
+try:
+    import orjson
+except ImportError:  # optional speedup; stdlib json is the fallback
+    orjson = None
+
 # Add parent directory to path to import paymaster_manager
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 from paymaster_manager import PaymasterManager
 
 load_dotenv()
 
+@functools.lru_cache(maxsize=None)
+def _load_abi(path):
+    """Parse a contract ABI file once per process (treat the result as read-only)."""
+    data = Path(path).read_bytes()
+    return orjson.loads(data) if orjson else json.loads(data)
+
 def release_funds_with_paymaster(seller_address, transaction_id):
     """Release funds using paymaster sponsorship."""
     
@@ -35,8 +48,7 @@ def release_funds_with_paymaster(seller_address, transaction_id):
         print("ERROR: ESCROW_CONTRACT_ADDRESS not set in .env")
         sys.exit(1)
     
-    with open('escrow_abi.json', 'r') as f:
-        escrow_abi = json.load(f)
+    escrow_abi = _load_abi('escrow_abi.json')
     
     # Load paymaster
     paymaster_address = os.getenv('PAYMASTER_ADDRESS')
@@ -44,8 +56,7 @@ def release_funds_with_paymaster(seller_address, transaction_id):
         print("ERROR: PAYMASTER_ADDRESS not set in .env")
         sys.exit(1)
     
-    with open('paymaster_abi.json', 'r') as f:
-        paymaster_abi = json.load(f)
+    paymaster_abi = _load_abi('paymaster_abi.json')
     
     # Get oracle account
     oracle_key = os.getenv('ORACLE_PRIVATE_KEY')
@@ -55,6 +66,9 @@ def release_funds_with_paymaster(seller_address, transaction_id):
     
     oracle_account = Account.from_key(oracle_key)
     
+    # Checksum up front so a malformed seller address fails before any RPC
+    seller = Web3.to_checksum_address(seller_address)
+    
     # Initialize paymaster manager
     paymaster = PaymasterManager(w3, paymaster_address, paymaster_abi)
     
@@ -81,7 +95,7 @@ def release_funds_with_paymaster(seller_address, transaction_id):
         oracle_address=oracle_account.address,
         target_contract=escrow_address,
         function_name='release',
-        function_args=(Web3.to_checksum_address(seller_address), transaction_id),
+        function_args=(seller, transaction_id),
         contract_abi=escrow_abi,
         gas_limit=150000
     )
@@ -6,10 +6,20 @@ Listens for blockchain events and sends notifications to Telegram.
 
 import os
 import time
-import json
+import sqlite3
+import asyncio
 import requests
+from concurrent.futures import ThreadPoolExecutor
+from requests.adapters import HTTPAdapter
+from eth_abi import decode as abi_decode
+from hexbytes import HexBytes
 from web3 import Web3
 
+try:
+    import orjson
+except ImportError:  # optional speedup; stdlib json is the fallback
+    orjson = None
+
 # Load environment
 try:
     from dotenv import load_dotenv
@@ -22,6 +32,59 @@ except ImportError:
 TELEGRAM_TOKEN = os.getenv("TELEGRAM_BOT_TOKEN")
 FACTORY_ADDRESS = os.getenv("FACTORY_CONTRACT_ADDRESS")
 ARC_RPC_URL = os.getenv("ARC_RPC_URL", "https://rpc.testnet.arc.network")
+# Optional: with a WebSocket endpoint, logs are pushed (eth_subscribe) instead of polled
+ARC_WSS_URL = os.getenv("ARC_WSS_URL")
+
+# Event topics and the factory address never change, so hash/checksum them once
+EVT_ESCROW_CREATED_TOPIC = Web3.to_hex(Web3.keccak(text='EscrowCreated(address,address,uint256)'))
+EVT_REQ_SET_TOPIC = Web3.to_hex(Web3.keccak(text='ContractRequirementsSet(address,string,string)'))
+FACTORY_CHECKSUM = Web3.to_checksum_address(FACTORY_ADDRESS) if FACTORY_ADDRESS else None
+
+# Filter templates; loops only add fromBlock/toBlock (or addresses) to copies
+_FACTORY_FILTER = {'address': FACTORY_CHECKSUM, 'topics': [EVT_ESCROW_CREATED_TOPIC]}
+_REQ_TOPICS = [EVT_REQ_SET_TOPIC]
+
+# ContractRequirementsSet(address indexed seller, string requirements, string sellerContact)
+_REQ_DATA_TYPES = ('string', 'string')
+
+# Retry delays during RPC outages double from 1s up to this cap
+MAX_BACKOFF = 60
+
+# Last processed block and known escrows, so a restart resumes instead of starting from "now"
+MONITOR_STATE_DB = 'telegram_monitor_state.db'
+
+# Escrow addresses per requirements filter / eth_getLogs call (keeps payloads under node limits)
+ADDRESS_CHUNK = 50
+
+# Keep-alive session to api.telegram.org; sends run on a small pool so event handling never waits on them
+_tg_session = requests.Session()
+_tg_session.mount('https://', HTTPAdapter(pool_connections=2, pool_maxsize=10))
+_tg_pool = ThreadPoolExecutor(max_workers=4)
+
+# Separate keep-alive session for RPC health probes
+_rpc_session = requests.Session()
+
+def _rpc_reachable(url):
+    """Probe the RPC endpoint with one lightweight JSON-RPC call."""
+    try:
+        response = _rpc_session.post(url, json={
+            "jsonrpc": "2.0", "id": 1, "method": "web3_clientVersion", "params": []
+        }, timeout=3)
+        return response.status_code == 200 and 'result' in response.json()
+    except Exception:
+        return False
+
+def _report_send(future):
+    """Log the outcome of a Telegram send."""
+    try:
+        response = future.result()
+    except Exception as e:
+        print(f"[Monitor] ❌ Failed to send message: {e}")
+        return
+    if response.status_code == 200:
+        print("[Monitor] ✅ Message sent successfully")
+    else:
+        print(f"[Monitor] ❌ Failed to send message: {response.text}")
 
 def handle_event(event):
     """
@@ -45,109 +108,313 @@ def handle_event(event):
 
         print(f"[Monitor] Sending Telegram message to {contact_info}...")
 
-        # Send to Telegram via HTTP POST
+        # Send to Telegram via HTTP POST (in the background)
         url = f"https://api.telegram.org/bot{TELEGRAM_TOKEN}/sendMessage"
-        response = requests.post(url, json={
+        payload = {
             "chat_id": contact_info, 
             "text": msg,
             "parse_mode": "Markdown"
-        })
-        
-        if response.status_code == 200:
-            print("[Monitor] ✅ Message sent successfully")
+        }
+        if orjson:
+            future = _tg_pool.submit(_tg_session.post, url, data=orjson.dumps(payload),
+                                     headers={"Content-Type": "application/json"}, timeout=10)
         else:
-            print(f"[Monitor] ❌ Failed to send message: {response.text}")
+            future = _tg_pool.submit(_tg_session.post, url, json=payload, timeout=10)
+        future.add_done_callback(_report_send)
             
     except Exception as e:
         print(f"[Monitor] Error handling event: {e}")
 
-def main():
-    print("🚀 Starting Telegram Monitor...")
-    
-    if not TELEGRAM_TOKEN:
-        print("❌ Error: TELEGRAM_BOT_TOKEN not found in environment")
-        return
+def _open_state():
+    """Open the monitor state database, creating it if needed"""
+    conn = sqlite3.connect(MONITOR_STATE_DB)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.execute("CREATE TABLE IF NOT EXISTS state(k TEXT PRIMARY KEY, v TEXT)")
+    conn.execute("CREATE TABLE IF NOT EXISTS escrows(address TEXT PRIMARY KEY, block INTEGER)")
+    # Requirements logs already dispatched from the WebSocket path, so a replay can skip them
+    conn.execute("CREATE TABLE IF NOT EXISTS sent(tx BLOB, log_index INTEGER, block INTEGER, PRIMARY KEY (tx, log_index))")
+    return conn
 
-    # Connect to Blockchain
-    web3 = None
-    while not web3 or not web3.is_connected():
-        try:
-            web3 = Web3(Web3.HTTPProvider(ARC_RPC_URL))
-            if web3.is_connected():
-                print(f"✅ Connected to {ARC_RPC_URL}")
-                break
-            else:
-                print("⚠️  Waiting for blockchain connection...")
-                time.sleep(5)
-        except Exception as e:
-            print(f"⚠️  Connection error: {e}")
-            time.sleep(5)
+def _load_state(conn):
+    """Return (last processed block or None, {escrow address: creation block} in discovery order)"""
+    row = conn.execute("SELECT v FROM state WHERE k = 'latest_block'").fetchone()
+    escrows = dict(conn.execute("SELECT address, block FROM escrows ORDER BY rowid"))
+    return (int(row[0]) if row else None), escrows
+
+def _load_sent(conn):
+    """Return {log id: block} for the dispatched logs the next replay may see again"""
+    return {(bytes(tx), log_index): block for tx, log_index, block in conn.execute("SELECT tx, log_index, block FROM sent")}
+
+def _mark_sent(conn, log):
+    """Record a dispatched requirements log"""
+    with conn:
+        conn.execute("INSERT OR IGNORE INTO sent VALUES (?, ?, ?)", (*_log_id(log), log['blockNumber']))
+
+def _save_state(conn, latest_block=None, new_escrows=()):
+    """Record the last processed block and any newly discovered escrows"""
+    with conn:
+        if latest_block is not None:
+            conn.execute("INSERT OR REPLACE INTO state VALUES ('latest_block', ?)", (str(latest_block),))
+            # Replays start at latest_block, so ids from earlier blocks can't come back
+            conn.execute("DELETE FROM sent WHERE block < ?", (latest_block,))
+        conn.executemany("INSERT OR IGNORE INTO escrows VALUES (?, ?)", new_escrows)
+
+def _decode_requirements(log):
+    """Decode a ContractRequirementsSet log straight from its topics/data (no ABI lookup per event)."""
+    requirements, contact_info = abi_decode(_REQ_DATA_TYPES, HexBytes(log['data']))
+    return {
+        'address': log['address'],
+        'args': {
+            'seller': Web3.to_checksum_address(HexBytes(log['topics'][1])[-20:]),
+            'requirements': requirements,
+            'sellerContact': contact_info
+        }
+    }
+
+async def _notify_worker(queue):
+    """Send queued notifications so a slow Telegram reply never stalls the subscription."""
+    while True:
+        event = await queue.get()
+        await asyncio.to_thread(handle_event, event)
+        queue.task_done()
+
+async def _catch_up(w3, from_block, to_block, active_escrows, state):
+    """Fetch factory and requirements logs emitted while the subscription was down."""
+    span = {'fromBlock': from_block, 'toBlock': to_block}
+    for log in await w3.eth.get_logs({**_FACTORY_FILTER, **span}):
+        escrow_address = Web3.to_checksum_address(log['topics'][1][-20:])
+        if escrow_address not in active_escrows:
+            active_escrows.add(escrow_address)
+            _save_state(state, new_escrows=[(escrow_address, log['blockNumber'])])
+            print(f"[Monitor] Found escrow: {escrow_address}")
+    req_logs = []
+    for chunk in _address_chunks(active_escrows):
+        req_logs.extend(await w3.eth.get_logs({**_requirements_params(chunk), **span}))
+    return req_logs
+
+async def subscribe_events():
+    """Receive factory and requirements logs over eth_subscribe and dispatch them."""
+    from web3 import AsyncWeb3, WebSocketProvider
+
+    state = _open_state()
+    latest_block, escrows = _load_state(state)
+    active_escrows = set(escrows)
+    queue = asyncio.Queue()
+    worker = asyncio.create_task(_notify_worker(queue))
 
-    # Load ABIs
     try:
-        with open('escrow_abi.json', 'r') as f:
-            escrow_abi = json.load(f)
-        with open('frontend/src/factory_abi.json', 'r') as f:
-            factory_abi = json.load(f)
-    except FileNotFoundError as e:
-        print(f"❌ Error loading ABIs: {e}")
-        return
+        async with AsyncWeb3(WebSocketProvider(ARC_WSS_URL)) as w3:
+            print(f"✅ Subscribed via {ARC_WSS_URL}")
+            await w3.eth.subscribe('logs', _FACTORY_FILTER)
+            # Escrows are discovered as we go, so listen network-wide and filter by address
+            await w3.eth.subscribe('logs', {'topics': _REQ_TOPICS})
 
-    # Initialize contracts
-    if not FACTORY_ADDRESS:
-        print("❌ Error: FACTORY_CONTRACT_ADDRESS not found")
-        return
-        
-    factory_contract = web3.eth.contract(address=Web3.to_checksum_address(FACTORY_ADDRESS), abi=factory_abi)
-    
-    # Track escrows
-    active_escrows = set()
-    latest_block = web3.eth.block_number
-    print(f"📡 Monitoring events from block {latest_block}...")
+            # Subscriptions only deliver new logs: replay the gap from the last processed block.
+            # That block is re-read, and its logs may also arrive over the subscription, so logs
+            # already dispatched (recorded in the state database) are skipped.
+            head = await w3.eth.block_number
+            sent = _load_sent(state)
+
+            def dispatch(log):
+                # Blocks before latest_block were fully covered by the catch-up or earlier dispatches
+                if (latest_block is not None and log['blockNumber'] < latest_block) or _log_id(log) in sent:
+                    return
+                sent[_log_id(log)] = log['blockNumber']
+                _mark_sent(state, log)
+                queue.put_nowait(_decode_requirements(log))
+
+            def advance(block):
+                nonlocal latest_block, sent
+                if latest_block is None or block > latest_block:
+                    latest_block = block
+                    _save_state(state, latest_block)
+                    sent = {key: b for key, b in sent.items() if b >= latest_block}
+
+            if latest_block is not None:
+                print(f"📡 Catching up from block {latest_block} ({len(active_escrows)} known escrows)...")
+                for log in await _catch_up(w3, latest_block, head, active_escrows, state):
+                    dispatch(log)
+            advance(head)
+
+            async for msg in w3.socket.process_subscriptions():
+                log = msg['result']
+                topic = Web3.to_hex(log['topics'][0])
+                if topic == EVT_ESCROW_CREATED_TOPIC:
+                    escrow_address = Web3.to_checksum_address(log['topics'][1][-20:])
+                    if escrow_address not in active_escrows:
+                        active_escrows.add(escrow_address)
+                        _save_state(state, new_escrows=[(escrow_address, log['blockNumber'])])
+                        print(f"[Monitor] Found escrow: {escrow_address}")
+                elif topic == EVT_REQ_SET_TOPIC and log['address'] in active_escrows:
+                    dispatch(log)
+                else:
+                    # Requirements logs from escrows we don't track say nothing about our progress
+                    continue
+                advance(log['blockNumber'])
+    finally:
+        # Queued logs' blocks are already saved as processed, so send them before reconnecting
+        await queue.join()
+        worker.cancel()
+
+def _log_id(log):
+    return (bytes(log['transactionHash']), log['logIndex'])
+
+def _requirements_params(addresses):
+    return {'address': list(addresses), 'topics': _REQ_TOPICS}
+
+def _address_chunks(addresses):
+    """Split escrow addresses so no single filter/getLogs payload grows unbounded."""
+    addresses = list(addresses)
+    return [addresses[i:i + ADDRESS_CHUNK] for i in range(0, len(addresses), ADDRESS_CHUNK)]
+
+def _get_logs_batch(web3, filters):
+    """eth_getLogs for several filters, in one JSON-RPC round-trip where batching is available."""
+    if not filters:
+        return []
+    if hasattr(web3, 'batch_requests'):
+        with web3.batch_requests() as batch:
+            for log_filter in filters:
+                batch.add(web3.eth.get_logs(log_filter))
+            results = batch.execute()
+    else:
+        # web3 < 7 has no batch support
+        results = [web3.eth.get_logs(log_filter) for log_filter in filters]
+    return [log for logs in results for log in logs]
+
+def _uninstall(web3, log_filter):
+    """Drop a server-side filter, ignoring nodes that already expired it."""
+    try:
+        web3.eth.uninstall_filter(log_filter.filter_id)
+    except Exception:
+        pass
+
+def poll_events(web3):
+    """Drain server-side log filters over HTTP (used when no WebSocket endpoint is configured)."""
+    # Track escrows (in discovery order): address -> block it was created in
+    state = _open_state()
+    latest_block, escrows = _load_state(state)
+    if latest_block is None:
+        latest_block = web3.eth.block_number
+        print(f"📡 Monitoring events from block {latest_block}...")
+    else:
+        # The catch-up on first install covers the downtime; the boundary block
+        # is re-read, so a notification from it may be sent twice
+        print(f"📡 Resuming from block {latest_block} ({len(escrows)} known escrows)...")
+    # Logs fetched by a get_logs catch-up can also come back from a filter; log id -> block
+    seen_logs = {}
+    # eth_newFilter handles: the node tracks the cursor and returns only new logs.
+    # Requirements filters cover ADDRESS_CHUNK escrows each, in discovery order;
+    # req_params holds each chunk's filter params, rebuilt on (re)install and when a chunk grows.
+    factory_filter = None
+    req_params = []
+    req_filters = []
+    backoff = 1
 
     while True:
         try:
-            current_block = web3.eth.block_number
+            if factory_filter is None:
+                # (Re)install filters, then catch up on anything since the last processed block.
+                # Chunks are rebuilt from every known escrow, including ones found just before an error.
+                current_block = web3.eth.block_number
+                req_params = [_requirements_params(chunk) for chunk in _address_chunks(escrows)]
+                factory_filter = web3.eth.filter(_FACTORY_FILTER)
+                req_filters = [web3.eth.filter(params) for params in req_params]
+                span = {'fromBlock': latest_block, 'toBlock': 'latest'}
+                logs = web3.eth.get_logs({**_FACTORY_FILTER, **span})
+                req_logs = _get_logs_batch(web3, [{**params, **span} for params in req_params])
+            elif hasattr(web3, 'batch_requests'):
+                # Head and every filter's changes in one JSON-RPC round-trip
+                with web3.batch_requests() as batch:
+                    batch.add(web3.eth.block_number)
+                    batch.add(web3.eth.get_filter_changes(factory_filter.filter_id))
+                    for req_filter in req_filters:
+                        batch.add(web3.eth.get_filter_changes(req_filter.filter_id))
+                    results = batch.execute()
+                current_block, logs = results[0], results[1]
+                req_logs = [log for changes in results[2:] for log in changes]
+            else:
+                # web3 < 7 has no batch support
+                current_block = web3.eth.block_number
+                logs = factory_filter.get_new_entries()
+                req_logs = [log for req_filter in req_filters for log in req_filter.get_new_entries()]
             
             # 1. Discover NEW escrows
-            escrow_filter = {
-                'fromBlock': latest_block,
-                'toBlock': current_block,
-                'address': Web3.to_checksum_address(FACTORY_ADDRESS),
-                'topics': [web3.keccak(text='EscrowCreated(address,address,uint256)').hex()]
-            }
-            logs = web3.eth.get_logs(escrow_filter)
-            
+            known = len(escrows)
             for log in logs:
-                escrow_address = Web3.to_checksum_address('0x' + log['topics'][1].hex()[-40:])
-                active_escrows.add(escrow_address)
-                print(f"[Monitor] Found escrow: {escrow_address}")
-
-            # 2. Listen for Requirements on ALL active escrows
-            if active_escrows:
-                req_filter = {
-                    'fromBlock': latest_block,
-                    'toBlock': current_block,
-                    'address': list(active_escrows),
-                    'topics': [web3.keccak(text='ContractRequirementsSet(address,string,string)').hex()]
-                }
-                
-                req_logs = web3.eth.get_logs(req_filter)
+                escrow_address = Web3.to_checksum_address(log['topics'][1][-20:])
+                if escrow_address not in escrows:
+                    escrows[escrow_address] = log['blockNumber']
+                    # Persisted right away, so an error later in this pass can't lose it
+                    _save_state(state, new_escrows=[(escrow_address, log['blockNumber'])])
+                    print(f"[Monitor] Found escrow: {escrow_address}")
+            
+            # A filter's addresses are fixed at creation, so replace the chunks that grew, then
+            # fetch what their escrows (new ones, and the gap while swapping) already emitted
+            if len(escrows) > known:
+                first = known // ADDRESS_CHUNK
+                for req_filter in req_filters[first:]:
+                    _uninstall(web3, req_filter)
+                grown = [_requirements_params(chunk) for chunk in _address_chunks(escrows)[first:]]
+                req_params = req_params[:first] + grown
+                req_filters = req_filters[:first] + [web3.eth.filter(params) for params in grown]
+                span = {'fromBlock': min([current_block] + [log['blockNumber'] for log in logs]), 'toBlock': 'latest'}
+                req_logs = list(req_logs) + _get_logs_batch(web3, [{**params, **span} for params in grown])
+
+            # 2. Requirements on ALL active escrows
+            for log in req_logs:
+                if _log_id(log) in seen_logs:
+                    continue
+                seen_logs[_log_id(log)] = log['blockNumber']
                 
-                for log in req_logs:
-                    # Decode event
-                    contract = web3.eth.contract(address=log['address'], abi=escrow_abi)
-                    decoded_event = contract.events.ContractRequirementsSet().process_log(log)
-                    
-                    # Call the user's handler
-                    handle_event(decoded_event)
+                # Decode event and call the user's handler
+                handle_event(_decode_requirements(log))
             
-            latest_block = current_block + 1
-            time.sleep(5)
+            # Catch-ups never reach back past the previous head, so older ids can go
+            seen_logs = {key: block for key, block in seen_logs.items() if block >= latest_block}
+            if current_block != latest_block:
+                _save_state(state, current_block)
+            latest_block = current_block
+            backoff = 1
+            time.sleep(1)
             
         except Exception as e:
-            print(f"[Monitor] Error in loop: {e}")
+            # Filters expire on some nodes after errors/idle time; reinstall and catch up
+            print(f"[Monitor] Error in loop: {e} (retrying in {backoff}s)")
+            factory_filter = None
+            time.sleep(backoff)
+            backoff = min(backoff * 2, MAX_BACKOFF)
+
+def main():
+    print("🚀 Starting Telegram Monitor...")
+    
+    if not TELEGRAM_TOKEN:
+        print("❌ Error: TELEGRAM_BOT_TOKEN not found in environment")
+        return
+
+    # Event logs are matched by topic and decoded directly, so no ABI files are needed
+    if not FACTORY_ADDRESS:
+        print("❌ Error: FACTORY_CONTRACT_ADDRESS not found")
+        return
+
+    if ARC_WSS_URL:
+        while True:
+            try:
+                asyncio.run(subscribe_events())
+            except Exception as e:
+                print(f"[Monitor] Subscription error: {e}. Reconnecting...")
             time.sleep(5)
 
+    # Connect to Blockchain
+    backoff = 1
+    while not _rpc_reachable(ARC_RPC_URL):
+        print(f"⚠️  Waiting for blockchain connection (retrying in {backoff}s)...")
+        time.sleep(backoff)
+        backoff = min(backoff * 2, MAX_BACKOFF)
+    web3 = Web3(Web3.HTTPProvider(ARC_RPC_URL))
+    print(f"✅ Connected to {ARC_RPC_URL}")
+
+    poll_events(web3)
+
 if __name__ == "__main__":
     main()
@@ -1,12 +1,19 @@
 import os
+import time
+import asyncio
 import requests
 import json
+from requests.adapters import HTTPAdapter
 import google.generativeai as genai
 
 # Test if we can reach Google with custom CERT bundle
-os.environ['REQUESTS_CA_BUNDLE'] = '/tmp/cacert.pem'
 os.environ['GRPC_DEFAULT_SSL_ROOTS_FILE_PATH'] = '/tmp/cacert.pem'
 
+# REST checks share one keep-alive session (and its CA bundle) so repeat probes skip the TLS handshake
+session = requests.Session()
+session.verify = '/tmp/cacert.pem'
+session.mount('https://', HTTPAdapter(pool_connections=1, pool_maxsize=4))
+
 # User provided Project ID (might be needed for Vertex path, or just context)
 # os.environ['GOOGLE_CLOUD_PROJECT'] = 'gen-lang-client-0134269917' 
 
@@ -24,24 +31,47 @@ if not api_key:
 
 print(f"Testing Connectivity (Key: {api_key[:5]}...)...")
 
+url = f"https://generativelanguage.googleapis.com/v1beta/models?key={api_key}"
+
+async def rest_check():
+    start = time.monotonic()
+    res = await asyncio.to_thread(session.get, url, timeout=5)
+    return res, time.monotonic() - start
+
+async def sdk_check():
+    # We must configure genai here
+    genai.configure(api_key=api_key)
+    model = genai.GenerativeModel('gemini-pro')
+    start = time.monotonic()
+    response = await model.generate_content_async("Hello")
+    return response, time.monotonic() - start
+
+async def run_checks():
+    # The two network paths are independent, so run them side by side
+    return await asyncio.gather(rest_check(), sdk_check(), return_exceptions=True)
+
 try:
+    rest_result, sdk_result = asyncio.run(run_checks())
+
     # 1. Test Simple Requests first (REST)
     print("1. Testing REST Reachability...")
-    url = f"https://generativelanguage.googleapis.com/v1beta/models?key={api_key}"
-    res = requests.get(url, timeout=5)
-    print(f"REST Status: {res.status_code}")
-    if res.status_code == 200:
-        print("✅ REST API IS ACCESSIBLE! (Using requests + /tmp/cacert.pem)")
+    if isinstance(rest_result, Exception):
+        print(f"❌ REST Failed: {rest_result}")
     else:
-        print(f"❌ REST Failed: {res.text[:200]}")
+        res, elapsed = rest_result
+        print(f"REST Status: {res.status_code} ({elapsed:.2f}s)")
+        if res.status_code == 200:
+            print("✅ REST API IS ACCESSIBLE! (Using requests + /tmp/cacert.pem)")
+        else:
+            print(f"❌ REST Failed: {res.text[:200]}")
 
     # 2. Test GRPC (SDK)
     print("\n2. Testing GRPC (SDK)...")
-    # We must configure genai here
-    genai.configure(api_key=api_key)
-    model = genai.GenerativeModel('gemini-pro')
-    response = model.generate_content("Hello")
-    print(f"✅ SDK SUCCESS: {response.text}")
+    if isinstance(sdk_result, Exception):
+        print(f"❌ SDK Failed: {sdk_result}")
+    else:
+        response, elapsed = sdk_result
+        print(f"✅ SDK SUCCESS ({elapsed:.2f}s): {response.text}")
 
 except Exception as e:
     print(f"❌ Connection Test Failed: {e}")
@@ -7,6 +7,8 @@ Helps debug Circle API connectivity and endpoint issues.
 import os
 import sys
 import requests
+from concurrent.futures import ThreadPoolExecutor
+from requests.adapters import HTTPAdapter
 from dotenv import load_dotenv
 
 # Load environment variables
@@ -49,40 +51,54 @@ def test_circle_api():
     print(f"\n🔍 Testing API endpoints...")
     print(f"Base URL: {base_url}")
     
-    # Test 1: Check API health/status
-    print("\n1. Testing API health...")
-    try:
-        # Try common health check endpoints
-        test_urls = [
-            f"{base_url}/v1/w3s/developer/wallets",
-            f"{base_url}/v1/w3s/wallets",
-            f"{base_url}/v1/w3s",
-            f"{base_url}/v1",
-        ]
-        
-        for url in test_urls:
-            try:
-                response = requests.get(url, headers=headers, timeout=5)
-                print(f"   {url}: {response.status_code}")
-                if response.status_code != 404:
-                    print(f"   ✅ Found working endpoint: {url}")
-                    print(f"   Response: {response.text[:200]}")
-                    break
-            except Exception as e:
-                print(f"   {url}: Error - {str(e)[:50]}")
-    except Exception as e:
-        print(f"   ❌ Error: {e}")
-    
-    # Test 2: Try to list wallets (if endpoint exists)
-    print("\n2. Testing wallet list endpoint...")
+    # Try common health check endpoints
+    test_urls = [
+        f"{base_url}/v1/w3s/developer/wallets",
+        f"{base_url}/v1/w3s/wallets",
+        f"{base_url}/v1/w3s",
+        f"{base_url}/v1",
+    ]
     test_endpoints = [
         f"{base_url}/v1/w3s/developer/wallets",
         f"{base_url}/v1/w3s/wallets",
     ]
     
+    # Probe every distinct URL at once over one keep-alive session;
+    # both tests below read from these results in their original order
+    session = requests.Session()
+    session.mount("https://", HTTPAdapter(pool_maxsize=8))
+    
+    def probe(url):
+        try:
+            return session.get(url, headers=headers, timeout=5)
+        except Exception as e:
+            return e
+    
+    urls = list(dict.fromkeys(test_urls + test_endpoints))
+    with ThreadPoolExecutor(max_workers=len(urls)) as ex:
+        responses = dict(zip(urls, ex.map(probe, urls)))
+    
+    # Test 1: Check API health/status
+    print("\n1. Testing API health...")
+    for url in test_urls:
+        response = responses[url]
+        if isinstance(response, Exception):
+            print(f"   {url}: Error - {str(response)[:50]}")
+            continue
+        print(f"   {url}: {response.status_code}")
+        if response.status_code != 404:
+            print(f"   ✅ Found working endpoint: {url}")
+            print(f"   Response: {response.text[:200]}")
+            break
+    
+    # Test 2: Try to list wallets (if endpoint exists)
+    print("\n2. Testing wallet list endpoint...")
     for endpoint in test_endpoints:
+        response = responses[endpoint]
+        if isinstance(response, Exception):
+            print(f"   Error: {str(response)[:100]}")
+            continue
         try:
-            response = requests.get(endpoint, headers=headers, timeout=5)
             print(f"   {endpoint}: {response.status_code}")
             if response.status_code == 200:
                 print(f"   ✅ Success! Endpoint works: {endpoint}")
@@ -1,5 +1,6 @@
 
 import os
+import time
 import google.generativeai as genai
 from dotenv import load_dotenv
 
@@ -25,7 +26,15 @@ if key:
 try:
     genai.configure(api_key=key)
     model = genai.GenerativeModel('gemini-pro')
-    response = model.generate_content("Hello")
-    print("SUCCESS! Output:", response.text)
+    # Stream so first-token latency is visible separately from the full round trip
+    start = time.monotonic()
+    first_token = None
+    parts = []
+    for chunk in model.generate_content("Hello", stream=True):
+        if first_token is None:
+            first_token = time.monotonic() - start
+        parts.append(chunk.text)
+    print(f"First token: {first_token:.2f}s, full response: {time.monotonic() - start:.2f}s")
+    print("SUCCESS! Output:", "".join(parts))
 except Exception as e:
     print("FAILED:", e)
@@ -1,33 +1,39 @@
+from concurrent.futures import ThreadPoolExecutor
 from hale_oracle_backend import HaleOracle
 import os
 
 def test_hardened_sandbox():
     oracle = HaleOracle("mock_key")
-    
+
     # 1. Test Environment Isolation (Should not see current ENV)
     os.environ['SECRET_KEY_PROBE'] = 'STOLEN_DATA'
     code_env = "import os\nif os.environ.get('SECRET_KEY_PROBE'): print('LEAKED')\nelse: print('ISOLATED')"
-    print(f"Testing Environment Isolation...")
-    res = oracle.run_sandbox_test(code_env)
-    print(f"Result: {res.get('output', '').strip()}")
-    
+
     # 2. Test Syscall Blocking (Should trigger SECURITY_VIOLATION)
     code_sys = "import os\nos.system('echo hacked')"
-    print(f"\nTesting System Call Blocking...")
-    res = oracle.run_sandbox_test(code_sys)
-    print(f"Result Error: {res.get('error')}")
-    
+
     # 3. Test File Access Blocking
     code_file = "import os\nos.remove('hale_oracle_backend.py')"
-    print(f"\nTesting File Deletion Blocking...")
-    res = oracle.run_sandbox_test(code_file)
-    print(f"Result Error: {res.get('error')}")
 
     # 4. Test Output Capping (Log Bomb)
     code_bomb = "print('A' * 20000)"
+
+    # Each case is its own sandbox subprocess, so run them side by side
+    codes = [code_env, code_sys, code_file, code_bomb]
+    with ThreadPoolExecutor(max_workers=len(codes)) as ex:
+        res_env, res_sys, res_file, res_bomb = ex.map(oracle.run_sandbox_test, codes)
+
+    print(f"Testing Environment Isolation...")
+    print(f"Result: {res_env.get('output', '').strip()}")
+
+    print(f"\nTesting System Call Blocking...")
+    print(f"Result Error: {res_sys.get('error')}")
+
+    print(f"\nTesting File Deletion Blocking...")
+    print(f"Result Error: {res_file.get('error')}")
+
     print(f"\nTesting Output Volume Capping...")
-    res = oracle.run_sandbox_test(code_bomb)
-    print(f"Output Length: {len(res.get('output', ''))} characters")
+    print(f"Output Length: {len(res_bomb.get('output', ''))} characters")
 
 if __name__ == "__main__":
     test_hardened_sandbox()
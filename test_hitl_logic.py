@@ -1,35 +1,53 @@
 import os
 import json
 import time
-from unittest.mock import MagicMock, patch
+from types import SimpleNamespace
+from unittest.mock import patch
 from hale_oracle_backend import HaleOracle
 
+class _FakeModel:
+    """Stands in for both the new client.models and a legacy GenerativeModel."""
+    def __init__(self, text):
+        self.text = text
+
+    def generate_content(self, *args, **kwargs):
+        return SimpleNamespace(text=self.text)
+
+class _FakeGenAI:
+    """Plain-class stand-in for the genai module (cheaper than MagicMock), replying with a fixed text."""
+    def __init__(self, text):
+        self.models = _FakeModel(text)
+
+    # New google.genai API
+    def Client(self, api_key=None):
+        return self
+
+    # Legacy google.generativeai API
+    def configure(self, **kwargs):
+        pass
+
+    def list_models(self, **kwargs):
+        return [SimpleNamespace(name='models/gemini-pro', supported_generation_methods=['generateContent'])]
+
+    def GenerativeModel(self, *args, **kwargs):
+        return self.models
+
 def test_hitl_queuing():
     """Verifies that borderline confidence triggers PENDING_REVIEW."""
     print("\n[TEST] Verifying HITL Queuing Logic...")
     
-    with patch('hale_oracle_backend.genai') as mock_genai:
+    json_str = json.dumps({
+        "transaction_id": "tx_hitl_test",
+        "verdict": "PASS",
+        "confidence_score": 75,
+        "release_funds": True,
+        "reasoning": "Looks okay but could be better.",
+        "risk_flags": []
+    })
+    
+    with patch('hale_oracle_backend.genai', _FakeGenAI(json_str)):
         oracle = HaleOracle("mock_key")
         
-        # Create a mock response that behaves like a real one
-        mock_res = MagicMock()
-        # Ensure .text returns the JSON string, and .text.strip() works
-        json_str = json.dumps({
-            "transaction_id": "tx_hitl_test",
-            "verdict": "PASS",
-            "confidence_score": 75,
-            "release_funds": True,
-            "reasoning": "Looks okay but could be better.",
-            "risk_flags": []
-        })
-        mock_res.text = json_str
-        
-        # Setup the mock client/model to return our mock_res
-        if hasattr(oracle, 'client') and oracle.client:
-             oracle.client.models.generate_content.return_value = mock_res
-        if hasattr(oracle, 'model') and oracle.model:
-             oracle.model.generate_content.return_value = mock_res
-             
         contract_data = {
             "transaction_id": "tx_hitl_test",
             "Contract_Terms": "Code something",
@@ -48,25 +66,18 @@ def test_sandbox_integration():
     """Verifies that code with errors triggers FAIL."""
     print("\n[TEST] Verifying Sandbox Integration Logic...")
     
-    with patch('hale_oracle_backend.genai') as mock_genai:
+    json_str = json.dumps({
+        "transaction_id": "tx_sandbox_test",
+        "verdict": "PASS",
+        "confidence_score": 98,
+        "release_funds": True,
+        "reasoning": "Perfect code!",
+        "risk_flags": []
+    })
+    
+    with patch('hale_oracle_backend.genai', _FakeGenAI(json_str)):
         oracle = HaleOracle("mock_key")
         
-        mock_res = MagicMock()
-        json_str = json.dumps({
-            "transaction_id": "tx_sandbox_test",
-            "verdict": "PASS",
-            "confidence_score": 98,
-            "release_funds": True,
-            "reasoning": "Perfect code!",
-            "risk_flags": []
-        })
-        mock_res.text = json_str
-        
-        if hasattr(oracle, 'client') and oracle.client:
-             oracle.client.models.generate_content.return_value = mock_res
-        if hasattr(oracle, 'model') and oracle.model:
-             oracle.model.generate_content.return_value = mock_res
-             
         contract_data = {
             "transaction_id": "tx_sandbox_test",
             "Contract_Terms": "Code something",
@@ -81,10 +92,61 @@ def test_sandbox_integration():
         assert "RUNTIME_ERROR" in verdict.get('risk_flags', [])
         print("✅ Sandbox Integration Verification Success.")
 
+def test_batch_verdicts_matched_by_transaction_id():
+    """Verifies that batch verdicts are paired with deliveries by id, not array position."""
+    print("\n[TEST] Verifying Batch Verdict Matching...")
+    
+    # The model answers the two cases in reverse order
+    json_str = json.dumps([
+        {
+            "transaction_id": "tx_batch_b",
+            "verdict": "FAIL",
+            "confidence_score": 10,
+            "release_funds": False,
+            "reasoning": "Essay is off-topic.",
+            "risk_flags": ["INCOMPLETE"]
+        },
+        {
+            "transaction_id": "tx_batch_a",
+            "verdict": "PASS",
+            "confidence_score": 97,
+            "release_funds": True,
+            "reasoning": "Haiku meets every criterion.",
+            "risk_flags": []
+        }
+    ])
+    
+    with patch('hale_oracle_backend.genai', _FakeGenAI(json_str)):
+        oracle = HaleOracle("mock_key")
+        
+        deliveries = [
+            {
+                "transaction_id": "tx_batch_a",
+                "Contract_Terms": "Write a haiku",
+                "Acceptance_Criteria": ["Three lines"],
+                "Delivery_Content": "Autumn moonlight\na worm digs silently\ninto the chestnut."
+            },
+            {
+                "transaction_id": "tx_batch_b",
+                "Contract_Terms": "Write an essay about oceans",
+                "Acceptance_Criteria": ["About oceans"],
+                "Delivery_Content": "Mountains are tall."
+            }
+        ]
+        
+        verdicts = oracle.verify_deliveries_batch(deliveries)
+        
+        print(f"Verdicts: {[v.get('verdict') for v in verdicts]}")
+        assert [v.get('transaction_id') for v in verdicts] == ["tx_batch_a", "tx_batch_b"]
+        assert verdicts[0].get('verdict') == 'PASS'
+        assert verdicts[1].get('verdict') == 'FAIL'
+        print("✅ Batch Verdict Matching Verification Success.")
+
 if __name__ == "__main__":
     try:
         test_hitl_queuing()
         test_sandbox_integration()
+        test_batch_verdicts_matched_by_transaction_id()
         print("\n🚀 ALL SAFEGUARD TESTS PASSED")
     except Exception as e:
         print(f"❌ TEST FAILED: {e}")
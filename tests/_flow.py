@@ -0,0 +1,138 @@
+"""
+Shared on-chain setup for the HALE integration tests (test_hale_oracle.py, test_full_flow.py).
+
+Holds the Web3 client, contract objects and the Deploy -> Deposit -> Set Requirements
+steps, so both suites reuse one connection pool, one parsed copy of each ABI and one
+set of checksummed addresses when they run in the same process.
+"""
+
+import os
+import json
+import time
+import functools
+import requests
+from requests.adapters import HTTPAdapter
+from web3 import Web3
+from web3.exceptions import TimeExhausted, TransactionNotFound
+
+try:
+    import orjson
+except ImportError:  # optional speedup; stdlib json is the fallback
+    orjson = None
+
+# Load environment
+try:
+    from dotenv import load_dotenv
+    load_dotenv()
+    load_dotenv('.env.local')
+except:
+    pass
+
+# Arc Testnet RPC - fallback to testnet if mainnet URL is in .env
+ARC_RPC_URL = os.getenv("ARC_TESTNET_RPC_URL", "https://rpc.testnet.arc.network")
+FACTORY_ADDRESS = os.getenv("FACTORY_CONTRACT_ADDRESS", "0x33e9915F122135B88fDEba6e8312f0cD8E678098")
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+FACTORY_ABI_PATH = "frontend/src/factory_abi.json"
+ESCROW_ABI_PATH = "frontend/src/escrow_abi.json"
+
+# Event signature hash, compared against raw log topics
+ESCROW_CREATED_TOPIC = Web3.keccak(text='EscrowCreated(address,address,uint256)')
+
+# Checksummed once at import rather than per call
+FACTORY_ADDRESS_CS = Web3.to_checksum_address(FACTORY_ADDRESS)
+
+GAS_PRICE = Web3.to_wei(20, 'gwei')
+
+# One keep-alive Web3 client for the RPC node
+_rpc_session = requests.Session()
+_rpc_session.mount("https://", HTTPAdapter(pool_connections=10, pool_maxsize=20, max_retries=2))
+WEB3 = Web3(Web3.HTTPProvider(ARC_RPC_URL, session=_rpc_session))
+
+def json_loads(data):
+    """Parse JSON (str or bytes, e.g. response.content), using orjson when it is installed"""
+    return orjson.loads(data) if orjson else json.loads(data)
+
+@functools.lru_cache(maxsize=8)
+def _load_abi(path):
+    """Parse an ABI file (relative to the repo root) once per run; treat the result as read-only"""
+    with open(os.path.join(BASE_DIR, path), 'rb') as f:
+        return json_loads(f.read())
+
+@functools.lru_cache(maxsize=8)
+def abi_function_names(path):
+    """Names of the functions an ABI file declares, for O(1) membership checks"""
+    return frozenset(item['name'] for item in _load_abi(path) if item.get('type') == 'function' and 'name' in item)
+
+# Contract objects build their function wrappers on construction, so make each one once
+FACTORY = WEB3.eth.contract(address=FACTORY_ADDRESS_CS, abi=_load_abi(FACTORY_ABI_PATH))
+
+@functools.lru_cache(maxsize=32)
+def escrow_contract(address):
+    """Escrow contract object for a (checksummed) address, shared across tests"""
+    return WEB3.eth.contract(address=address, abi=_load_abi(ESCROW_ABI_PATH))
+
+def wait_receipt(web3, tx_hash, timeout=60):
+    """Poll for a receipt with backoff (0.5s growing to 4s) instead of every 0.1s"""
+    delay = 0.5
+    deadline = time.monotonic() + timeout
+    while True:
+        try:
+            return web3.eth.get_transaction_receipt(tx_hash)
+        except TransactionNotFound:
+            if time.monotonic() + delay > deadline:
+                raise TimeExhausted(f"Transaction {tx_hash.hex()} not mined after {timeout} seconds")
+            time.sleep(delay)
+            delay = min(delay * 1.5, 4.0)
+
+# Gas limits estimated once per contract function (+20% headroom) and reused for later calls
+_GAS_LIMITS = {}
+
+def gas_limit(fn, tx_params, fallback):
+    """Estimate gas for a contract call once; use the fixed fallback if the node can't estimate it"""
+    if fn.fn_name not in _GAS_LIMITS:
+        try:
+            _GAS_LIMITS[fn.fn_name] = int(fn.estimate_gas(tx_params) * 1.2)
+        except Exception:
+            return fallback
+    return _GAS_LIMITS[fn.fn_name]
+
+def _send(web3, account, fn, nonce, gas, value=0):
+    """Sign and broadcast a contract call; returns the tx hash without waiting for it"""
+    tx = fn.build_transaction({
+        'from': account.address,
+        'value': value,
+        'nonce': nonce,
+        'gas': gas,
+        'gasPrice': GAS_PRICE
+    })
+    signed = account.sign_transaction(tx)
+    return web3.eth.send_raw_transaction(signed.raw_transaction)
+
+def deploy_escrow(web3, account, nonce):
+    """
+    Create an escrow through the factory and wait for it to be mined.
+    Returns (tx_hash, receipt, escrow_address); the address is None if no EscrowCreated log was emitted.
+    """
+    fn = FACTORY.functions.createEscrow()
+    tx_hash = _send(web3, account, fn, nonce, gas_limit(fn, {'from': account.address}, 2000000))
+    receipt = wait_receipt(web3, tx_hash)
+
+    for log in receipt.logs:
+        if log.topics and log.topics[0] == ESCROW_CREATED_TOPIC:
+            return tx_hash, receipt, Web3.to_checksum_address(log.topics[1][-20:])
+    return tx_hash, receipt, None
+
+def deposit(web3, account, escrow, seller, amount, nonce):
+    """Send a deposit for `seller`; returns the tx hash without waiting for it"""
+    fn = escrow.functions.deposit(seller)
+    gas = gas_limit(fn, {'from': account.address, 'value': amount}, 200000)
+    return _send(web3, account, fn, nonce, gas, value=amount)
+
+def set_requirements(web3, account, escrow, seller, requirements, contact, nonce, estimate=True):
+    """
+    Send setContractRequirements; returns the tx hash without waiting for it.
+    Pass estimate=False when the deposit it depends on may not be mined yet.
+    """
+    fn = escrow.functions.setContractRequirements(seller, requirements, contact)
+    gas = gas_limit(fn, {'from': account.address}, 300000) if estimate else 300000
+    return _send(web3, account, fn, nonce, gas)
